@@ -0,0 +1,70 @@
+import random
+import time
+
+from sqlalchemy import or_
+from sqlalchemy.exc import OperationalError
+
+from models import db, Booking, Rooms
+
+CANCELED = "canceled"
+
+RESERVATION_ATTEMPTS = 5
+RETRY_BACKOFF = 0.05
+
+# serialization_failure, deadlock_detected, lock_not_available
+RETRYABLE_PGCODES = {'40001', '40P01', '55P03'}
+
+
+def active_bookings():
+    """Filter clause for bookings that still hold their room (anything not canceled)."""
+    return or_(Booking.status.is_(None), Booking.status != CANCELED)
+
+
+def lock_room(room_id):
+    """Load the room with a lock held until the transaction ends, or None if it does not exist.
+
+    PostgreSQL locks just the row with FOR UPDATE. SQLite ignores FOR UPDATE,
+    and pysqlite only opens a transaction at the first write, so there the
+    database write lock is taken up front with BEGIN IMMEDIATE instead.
+    """
+    if db.session.get_bind().dialect.name == 'sqlite':
+        connection = db.session.connection().connection.driver_connection
+        if not connection.in_transaction:
+            connection.execute('BEGIN IMMEDIATE')
+    return Rooms.query.with_for_update().filter_by(id=room_id).first()
+
+
+def find_conflicting_booking(room_id, start_date, end_date):
+    """Return an active booking on the room that overlaps [start_date, end_date), or None.
+
+    Answered by the composite (room_id, start_date, end_date, status) index.
+    Called under the room's row lock, so the answer holds until the commit.
+    """
+    return Booking.query.filter(
+        Booking.room_id == room_id,
+        Booking.end_date > start_date,
+        Booking.start_date < end_date,
+        active_bookings()
+    ).first()
+
+
+def is_retryable(error):
+    pgcode = getattr(error.orig, 'pgcode', None)
+    if pgcode:
+        return pgcode in RETRYABLE_PGCODES
+    return 'database is locked' in str(error.orig)
+
+
+def run_with_retry(work, attempts=RESERVATION_ATTEMPTS):
+    """Call work() and retry it when the database aborts it as a serialization failure.
+
+    The session is rolled back before every retry; the last failure is re-raised.
+    """
+    for attempt in range(attempts):
+        try:
+            return work()
+        except OperationalError as error:
+            db.session.rollback()
+            if attempt == attempts - 1 or not is_retryable(error):
+                raise
+            time.sleep(RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
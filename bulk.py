@@ -0,0 +1,347 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+from types import SimpleNamespace
+
+from sqlalchemy import func, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, Accommodations, Accommodation_rating, Booking, Payments, Rooms
+from email_validation import is_valid_email
+from passwords import hasher, is_strong_password
+from search import search_index
+
+CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+MAX_REPORTED_ERRORS = 100
+
+# The limits Room.post and RoomList.patch enforce
+ROOM_NO_RANGE = (1, 100)
+ROOM_PRICE_RANGE = (5000, 30000)
+
+KINDS = ('accommodations', 'rooms', 'users')
+FORMATS = ('csv', 'ndjson')
+
+# (field, type, required) in export column order
+FIELDS = {
+    'accommodations': (
+        ('name', str, True), ('image', str, True), ('description', str, True),
+        ('latitude', float, True), ('longitude', float, True),
+    ),
+    'rooms': (
+        ('room_no', int, True), ('room_type', str, True), ('price', int, True), ('accommodation_id', int, True),
+        ('availability', bool, True), ('image', str, True), ('description', str, True),
+    ),
+    'users': (
+        ('name', str, True), ('email', str, True), ('password', str, True), ('role', str, False),
+    ),
+}
+EXPORT_COLUMNS = {
+    'accommodations': ('id', 'name', 'image', 'description', 'latitude', 'longitude'),
+    'rooms': ('id', 'room_no', 'room_type', 'price', 'accommodation_id', 'availability', 'image', 'description'),
+    'users': ('id', 'name', 'email', 'role'),
+}
+MODELS = {'accommodations': Accommodations, 'rooms': Rooms, 'users': User}
+
+TYPE_NAMES = {str: 'text', int: 'a whole number', float: 'a number', bool: 'a boolean value'}
+BOOLEAN_TEXT = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+INVALID = object()
+
+
+def read_rows(stream, format):
+    """Yield (line, row) from a CSV or NDJSON byte stream without reading it all into memory.
+
+    row is None for an NDJSON line that is not a JSON object.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line, raw in enumerate(text, 1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError:
+            row = None
+        yield line, row if isinstance(row, dict) else None
+
+
+def coerce(value, type, from_text):
+    """Convert a CSV cell, or check a JSON value, against a field type."""
+    if from_text:
+        value = value.strip()
+        if type is bool:
+            return BOOLEAN_TEXT.get(value.lower(), INVALID)
+        if type in (int, float):
+            try:
+                return type(value)
+            except ValueError:
+                return INVALID
+        return value
+
+    if type is bool:
+        return value if isinstance(value, bool) else INVALID
+    if type in (int, float):
+        # bool is an int subclass, but True is not a room number
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return INVALID
+        if type is int and value != int(value):
+            return INVALID
+        return type(value)
+    return value if isinstance(value, str) else INVALID
+
+
+def check_column(errors, values, failed, message):
+    """Record message against every row in values (a list aligned with the chunk) for which failed(value) holds."""
+    for index, value in enumerate(values):
+        if index not in errors and failed(value):
+            errors[index] = message
+
+
+class Importer:
+    """Validates and inserts one kind of row a chunk at a time.
+
+    Every check runs down a whole column of the chunk, and duplicates are
+    found with one set query per chunk, so a 500-row chunk costs a few
+    queries and a single commit instead of 500 round trips. Rows that fail a
+    check are reported by line and skipped; chunks that pass commit on their
+    own, so a late bad row never undoes earlier work.
+    """
+
+    def __init__(self, kind, format, chunk_size=CHUNK_SIZE):
+        self.kind = kind
+        self.format = format
+        self.chunk_size = chunk_size
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.accommodation_ids = set()
+
+    def run(self, stream):
+        rows = read_rows(stream, self.format)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        return self.report()
+
+    def report(self):
+        return {
+            'kind': self.kind,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+    def reject(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def import_chunk(self, chunk):
+        lines = [line for line, _ in chunk]
+        errors = {}
+        columns = self.parse(chunk, errors)
+        getattr(self, f'validate_{self.kind}')(columns, errors)
+
+        valid = [index for index in range(len(chunk)) if index not in errors]
+        for index in sorted(errors):
+            self.reject(lines[index], errors[index])
+        if not valid:
+            return
+
+        mappings = [{field: columns[field][index] for field in columns} for index in valid]
+        try:
+            getattr(self, f'insert_{self.kind}')(mappings)
+            db.session.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent writer; the whole chunk rolls back together
+            db.session.rollback()
+            for index in valid:
+                self.reject(lines[index], 'Conflicts with a row written while the import was running!')
+            return
+        self.inserted += len(mappings)
+
+    def parse(self, chunk, errors):
+        """Turn the chunk into {field: [value per row]}, noting rows with missing or mistyped fields."""
+        from_text = self.format == 'csv'
+        columns = {}
+        for field, type, required in FIELDS[self.kind]:
+            values = []
+            for index, (_, row) in enumerate(chunk):
+                if row is None:
+                    errors.setdefault(index, 'Each line must be a JSON object!')
+                    values.append(None)
+                    continue
+                value = row.get(field)
+                if value is None or (from_text and not value.strip()):
+                    if required:
+                        errors.setdefault(index, 'Missing required fields!')
+                    values.append(None)
+                    continue
+                value = coerce(value, type, from_text)
+                if value is INVALID:
+                    errors.setdefault(index, f'{field} must be {TYPE_NAMES[type]}!')
+                    value = None
+                values.append(value)
+            columns[field] = values
+        return columns
+
+    def validate_accommodations(self, columns, errors):
+        check_column(errors, columns['latitude'], lambda lat: not -90 <= lat <= 90, 'latitude must be between -90 and 90!')
+        check_column(errors, columns['longitude'], lambda lng: not -180 <= lng <= 180, 'longitude must be between -180 and 180!')
+
+    def validate_rooms(self, columns, errors):
+        min, max = ROOM_NO_RANGE
+        check_column(errors, columns['room_no'], lambda room_no: not min <= room_no <= max,
+                     f'Hostel rooms must be between {min} and {max} respectively!')
+        min, max = ROOM_PRICE_RANGE
+        check_column(errors, columns['price'], lambda price: not min <= price <= max,
+                     f'Room price must be between {min} and {max} price!')
+
+        accommodation_ids = {columns['accommodation_id'][index] for index in range(len(columns['accommodation_id'])) if index not in errors}
+        known = {id for id, in db.session.query(Accommodations.id).filter(Accommodations.id.in_(accommodation_ids))}
+        check_column(errors, columns['accommodation_id'], lambda id: id not in known, 'Accommodation not found!')
+
+        # One query against _room_accommodation_uc for the whole chunk, then a pass for repeats within it
+        keys = list(zip(columns['accommodation_id'], columns['room_no']))
+        wanted = {keys[index] for index in range(len(keys)) if index not in errors}
+        taken = set()
+        if wanted:
+            taken = set(
+                db.session.query(Rooms.accommodation_id, Rooms.room_no)
+                .filter(tuple_(Rooms.accommodation_id, Rooms.room_no).in_(wanted))
+            )
+        message = 'A room with this number already exists in the selected accommodation!'
+        for index, key in enumerate(keys):
+            if index in errors:
+                continue
+            if key in taken:
+                errors[index] = message
+            taken.add(key)
+
+    def validate_users(self, columns, errors):
+        check_column(errors, columns['email'], lambda email: not is_valid_email(email),
+                     'Invalid email format, please provide a valid email address.')
+        check_column(errors, columns['password'], lambda password: not is_strong_password(password),
+                     'Password must be at least 8 characters long and contain both letters and numbers.')
+        columns['role'] = [role or 'user' for role in columns['role']]
+
+        emails = columns['email']
+        wanted = {emails[index] for index in range(len(emails)) if index not in errors}
+        taken = set()
+        if wanted:
+            taken = {email for email, in db.session.query(User.email).filter(User.email.in_(wanted))}
+        for index, email in enumerate(emails):
+            if index in errors:
+                continue
+            if email in taken:
+                errors[index] = 'Email already exists!'
+            taken.add(email)
+
+    def insert_accommodations(self, mappings):
+        db.session.bulk_insert_mappings(Accommodations, mappings, return_defaults=True)
+        db.session.bulk_insert_mappings(Accommodation_rating, [{'accommodation_id': mapping['id']} for mapping in mappings])
+        for mapping in mappings:
+            search_index.index_accommodation(SimpleNamespace(**mapping))
+            self.accommodation_ids.add(mapping['id'])
+
+    def insert_rooms(self, mappings):
+        db.session.bulk_insert_mappings(Rooms, mappings, return_defaults=True)
+        for mapping in mappings:
+            search_index.index_room(SimpleNamespace(**mapping))
+            self.accommodation_ids.add(mapping['accommodation_id'])
+
+    def insert_users(self, mappings):
+        hashes = hasher.hash_many([mapping['password'] for mapping in mappings])
+        for mapping, hash in zip(mappings, hashes):
+            mapping['password'] = hash
+        db.session.bulk_insert_mappings(User, mappings)
+
+
+def stream_rows(query, columns, format, chunk_size=CHUNK_SIZE):
+    """Yield the rows of a column query as CSV or NDJSON text, one chunk of rows per piece.
+
+    Rows are fetched chunk_size at a time (a server-side cursor on
+    PostgreSQL), so memory stays flat however many rows match.
+    """
+    query = query.execution_options(yield_per=chunk_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if format == 'csv' else None
+    if writer:
+        writer.writerow(columns)
+
+    for count, row in enumerate(query, 1):
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, row)), default=str) + '\n')
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_rows(kind, format, chunk_size=CHUNK_SIZE):
+    """Stream a whole table, selecting only its exported columns."""
+    model = MODELS[kind]
+    columns = EXPORT_COLUMNS[kind]
+    query = db.session.query(*(getattr(model, column) for column in columns)).order_by(model.id)
+    return stream_rows(query, columns, format, chunk_size)
+
+
+BOOKING_EXPORT_COLUMNS = (
+    'id', 'user_id', 'user_name', 'user_email', 'accommodation_id', 'accommodation_name', 'room_id', 'room_no',
+    'start_date', 'end_date', 'status', 'payment_count', 'amount_paid', 'last_payment_date',
+)
+
+
+def booking_export_query(start=None, end=None, status=None):
+    """Bookings with their guest, place and payment totals as flat rows for reconciliation.
+
+    start and end keep bookings whose stay overlaps that range. Payments are
+    summed per booking in a subquery, so each booking is still one row.
+    """
+    totals = (
+        db.session.query(
+            Payments.booking_id.label('booking_id'),
+            func.count(Payments.id).label('payment_count'),
+            func.sum(Payments.payment_amount).label('amount_paid'),
+            func.max(Payments.payment_date).label('last_payment_date'),
+        )
+        .filter(Payments.booking_id.isnot(None))
+        .group_by(Payments.booking_id)
+        .subquery()
+    )
+    query = (
+        db.session.query(
+            Booking.id, Booking.user_id, User.name, User.email, Booking.accommodation_id, Accommodations.name,
+            Booking.room_id, Rooms.room_no, Booking.start_date, Booking.end_date,
+            func.coalesce(Booking.status, 'confirmed'),
+            func.coalesce(totals.c.payment_count, 0), func.coalesce(totals.c.amount_paid, 0), totals.c.last_payment_date,
+        )
+        .join(User, Booking.user_id == User.id)
+        .join(Accommodations, Booking.accommodation_id == Accommodations.id)
+        .join(Rooms, Booking.room_id == Rooms.id)
+        .outerjoin(totals, totals.c.booking_id == Booking.id)
+        .order_by(Booking.id)
+    )
+    if start:
+        query = query.filter(Booking.end_date > start)
+    if end:
+        query = query.filter(Booking.start_date < end)
+    if status == 'confirmed':
+        # Rows from before status had a default are confirmed bookings too
+        query = query.filter(or_(Booking.status == status, Booking.status.is_(None)))
+    elif status:
+        query = query.filter(Booking.status == status)
+    return query
@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import Counter, Gauge, registry
+
+# redis:// URL of the shared tier; unset keeps the cache per process
+CATALOG_CACHE_URL = os.getenv('CATALOG_CACHE_URL')
+
+lookups = registry.register(Counter(
+    'catalog_cache_lookups_total', 'Catalog cache lookups by where the response came from.', ('result',)))
+
+
+class CatalogCache:
+    """Read-through cache for catalog responses, invalidated by tag.
+
+    Every cached key lists the tags it depends on (e.g. 'accommodations',
+    'rooms:3'). Invalidating a tag bumps its generation, which changes the
+    key of everything built from it, so stale entries are never read again
+    and simply fall out of the LRU.
+
+    The optional shared tier is any client with redis-style get(key),
+    set(key, value, ex=seconds) and incr(key). When one is set, generations
+    live there too, so a write in one worker invalidates every worker.
+
+    Only 200 responses are stored: a 404 for a row that is created later
+    must not outlive the create.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, shared=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _generation(self, tag):
+        if self.shared is not None:
+            return int(self.shared.get(f'catalog:gen:{tag}') or 0)
+        return self._generations.get(tag, 0)
+
+    def _key(self, tags, key):
+        generations = ','.join(f'{tag}={self._generation(tag)}' for tag in tags)
+        return f'catalog:{key}|{generations}'
+
+    def get_or_load(self, tags, key, loader):
+        """Return the cached (body, status) for key, calling loader() to build it on a miss."""
+        full_key = self._key(tags, key)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(full_key)
+            hit = entry is not None and entry[0] > now
+            if hit:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+        if hit:
+            lookups.inc(result='hit')
+            return entry[1]
+
+        value = None
+        if self.shared is not None:
+            raw = self.shared.get(full_key)
+            if raw is not None:
+                value = tuple(json.loads(raw))
+                with self._lock:
+                    self.shared_hits += 1
+                lookups.inc(result='shared_hit')
+
+        if value is None:
+            value = loader()
+            with self._lock:
+                self.misses += 1
+            lookups.inc(result='miss')
+            if value[1] != 200:
+                return value
+            if self.shared is not None:
+                self.shared.set(full_key, json.dumps(value), ex=self.ttl)
+
+        with self._lock:
+            self._entries[full_key] = (now + self.ttl, value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            if self.shared is not None:
+                self.shared.incr(f'catalog:gen:{tag}')
+            else:
+                with self._lock:
+                    self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.shared_hits + self.misses
+            return {
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.shared_hits) / total if total else 0.0,
+                'size': len(self._entries)
+            }
+
+
+catalog_cache = CatalogCache(
+    maxsize=int(os.getenv('CATALOG_CACHE_SIZE', 1024)),
+    ttl=int(os.getenv('CATALOG_CACHE_TTL', 60))
+)
+
+registry.register(Gauge(
+    'catalog_cache_entries', "Responses held in this process's catalog cache.", (), lambda: {(): catalog_cache.stats()['size']}))
+registry.register(Gauge(
+    'catalog_cache_hit_ratio', 'Share of catalog cache lookups answered without calling the loader.', (), lambda: {(): catalog_cache.stats()['hit_ratio']}))
+
+
+def init_cache(app):
+    """Plug in the shared tier: CATALOG_CACHE_SHARED if given a client, else one for CATALOG_CACHE_URL.
+
+    A URL needs the redis package; without either, each worker keeps its own cache.
+    """
+    shared = app.config.setdefault('CATALOG_CACHE_SHARED', None)
+    url = app.config.setdefault('CATALOG_CACHE_URL', CATALOG_CACHE_URL)
+    if shared is None and url:
+        import redis
+        shared = redis.Redis.from_url(url)
+    catalog_cache.shared = shared
+    app.extensions['shared_cache'] = shared
@@ -0,0 +1,48 @@
+import hashlib
+from datetime import timezone
+
+from flask import request, Response
+from sqlalchemy import func
+from werkzeug.http import http_date
+
+from models import db
+
+
+def table_version(*models):
+    """Fingerprint tables by row count and newest updated_at, without loading any rows.
+
+    The count catches deletes, which never move max(updated_at).
+    """
+    parts = []
+    for model in models:
+        key = model.__mapper__.primary_key[0]
+        count, last = db.session.query(func.count(key), func.max(model.updated_at)).one()
+        parts.append(f"{model.__tablename__}:{count}:{last.isoformat() if last else ''}")
+    return '|'.join(parts)
+
+
+def conditional_get(version, loader, last_modified=None):
+    """Answer 304 when the client's If-None-Match/If-Modified-Since still match version.
+
+    Otherwise call loader() for the (body, status) response and attach the
+    validators to it. last_modified should only be passed for single rows;
+    a collection's newest timestamp does not change when a row is deleted.
+    """
+    etag = hashlib.sha1(f'{request.full_path}|{version}'.encode()).hexdigest()
+    headers = {'ETag': f'"{etag}"'}
+    if last_modified:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+        headers['Last-Modified'] = http_date(last_modified)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(last_modified and request.if_modified_since and last_modified <= request.if_modified_since)
+
+    if not_modified:
+        return Response(status=304, headers=headers)
+
+    body, status = loader()
+    if status != 200:
+        return body, status
+    return body, status, headers
@@ -0,0 +1,31 @@
+import os
+
+
+class Config:
+    """Settings read from the environment; create_app(config) overrides any of them.
+
+    Read when this module is first imported, so load .env before importing it.
+    """
+
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
+    JWT_SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
+
+    EMAIL_VALIDATION_API_URL = os.getenv('EMAIL_VALIDATION_API_URL')
+    EMAIL_VALIDATION_API_KEY = os.getenv('EMAIL_VALIDATION_API_KEY')
+
+    MPESA_CONSUMER_KEY = os.getenv('CONSUMER_KEY')
+    MPESA_CONSUMER_SECRET = os.getenv('CONSUMER_SECRET')
+    MPESA_SHORTCODE = os.getenv('SHORTCODE')
+    MPESA_PASSKEY = os.getenv('PASSKEY')
+    MPESA_TOKEN_URL = 'https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials'
+    MPESA_STK_PUSH_URL = 'https://sandbox.safaricom.co.ke/mpesa/stkpush/v1/processrequest'
+    MPESA_CALLBACK_URL = os.getenv('MPESA_CALLBACK_URL', 'https://moringa-hostels-backend-ebzd.onrender.com/mpesa/callback')
+    MPESA_WORKERS = int(os.getenv('MPESA_WORKERS', 4))
+    # Longer than a push can take, token fetch retries included
+    MPESA_JOB_STALE_SECONDS = int(os.getenv('MPESA_JOB_STALE_SECONDS', 300))
+    MPESA_SWEEP_SECONDS = int(os.getenv('MPESA_SWEEP_SECONDS', 60))
+    MPESA_CALLBACK_BATCH = int(os.getenv('MPESA_CALLBACK_BATCH', 100))
+    MPESA_CALLBACK_FLUSH = float(os.getenv('MPESA_CALLBACK_FLUSH', 1.0))
+    MPESA_CALLBACK_LOG = os.getenv('MPESA_CALLBACK_LOG', 'mpesa_callback.log')
@@ -0,0 +1,107 @@
+import os
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool, Pool, QueuePool
+
+from metrics import Counter, Gauge, Histogram, registry
+from models import db
+
+# Sized per gunicorn worker: workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) must fit under max_connections
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+# Below the provider's idle cut-off, so connections are replaced before the server drops them
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 300))
+POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') == '1'
+STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+# Set when DATABASE_URL points at PgBouncer in transaction pooling mode
+PGBOUNCER = os.getenv('DB_PGBOUNCER', '0') == '1'
+
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+checkout_seconds = registry.register(Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting to check a connection out of the pool.', ('pool',), CHECKOUT_BUCKETS))
+checkout_timeouts = registry.register(Counter(
+    'db_pool_checkout_timeouts_total', 'Checkouts that gave up after DB_POOL_TIMEOUT.', ('pool',)))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool that times each checkout, including any reconnect or pre-ping it triggers."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            checkout_timeouts.inc(pool=self.logging_name)
+            raise
+        finally:
+            checkout_seconds.observe(time.perf_counter() - start, pool=self.logging_name)
+
+
+def engine_options(url, name='primary'):
+    """SQLALCHEMY_ENGINE_OPTIONS for a PostgreSQL url; other databases keep the defaults."""
+    if not url or make_url(url).get_backend_name() != 'postgresql':
+        return {}
+    if PGBOUNCER:
+        # PgBouncer already pools server connections and rejects startup options,
+        # so hold nothing between requests and set the timeout per transaction
+        return {'poolclass': NullPool, 'pool_logging_name': name}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_logging_name': name,
+        'pool_size': POOL_SIZE,
+        'max_overflow': MAX_OVERFLOW,
+        'pool_timeout': POOL_TIMEOUT,
+        'pool_recycle': POOL_RECYCLE,
+        'pool_pre_ping': POOL_PRE_PING,
+        'connect_args': {'options': f'-c statement_timeout={STATEMENT_TIMEOUT_MS}'},
+    }
+
+
+@event.listens_for(Session, 'after_begin')
+def set_transaction_timeout(session, transaction, connection):
+    if PGBOUNCER and connection.dialect.name == 'postgresql':
+        # SET LOCAL ends with the transaction, so nothing leaks to the next PgBouncer client
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {STATEMENT_TIMEOUT_MS}')
+
+
+@event.listens_for(Pool, 'connect')
+def remember_pid(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+
+@event.listens_for(Pool, 'checkout')
+def check_pid(dbapi_connection, connection_record, connection_proxy):
+    # A connection opened before gunicorn forked shares its socket with the parent;
+    # drop it without closing and let the pool open a fresh one for this worker
+    pid = os.getpid()
+    if connection_record.info['pid'] != pid:
+        connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+        raise exc.DisconnectionError(f"Connection belongs to pid {connection_record.info['pid']}, not {pid}")
+
+
+def instrumented_pools():
+    return [engine.pool for engine in db.engines.values() if isinstance(engine.pool, InstrumentedQueuePool)]
+
+
+def pool_states():
+    states = {}
+    for pool in instrumented_pools():
+        states[(pool.logging_name, 'checked_out')] = pool.checkedout()
+        states[(pool.logging_name, 'idle')] = pool.checkedin()
+        states[(pool.logging_name, 'overflow')] = max(pool.overflow(), 0)
+    return states
+
+
+def pool_capacity():
+    return {(pool.logging_name,): pool.size() + MAX_OVERFLOW for pool in instrumented_pools()}
+
+
+registry.register(Gauge(
+    'db_pool_connections', 'Connections held by the pool, by state.', ('pool', 'state'), pool_states))
+registry.register(Gauge(
+    'db_pool_capacity', 'Most connections the pool will open; checked_out / capacity is saturation.', ('pool',), pool_capacity))
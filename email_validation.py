@@ -0,0 +1,121 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+TIMEOUT = (2, 5)
+
+
+def is_valid_email(email):
+    return re.match(r"[^@]+@[^@]+\.[^@]+", email)
+
+
+class TTLCache:
+    """A small thread-safe LRU whose entries each carry their own expiry."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+class EmailValidator:
+    """Checks deliverability through the email-verification API, remembering the answers.
+
+    Results are cached per normalized address: deliverable ones for
+    positive_ttl, undeliverable ones for the shorter negative_ttl. When the
+    API reports a domain has no MX records, the whole domain is remembered
+    as undeliverable for domain_ttl, so other addresses there skip the call.
+    Gateway errors are not cached.
+    """
+
+    def __init__(self, api_url, api_key, session=None, positive_ttl=7 * 24 * 3600, negative_ttl=3600,
+                 domain_ttl=24 * 3600, batch_workers=8):
+        self.api_url = api_url
+        self.api_key = api_key
+        if session is None:
+            # requests is only loaded once an app actually validates addresses
+            from sessions import make_session
+            session = make_session()
+        self.session = session
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.domain_ttl = domain_ttl
+        self.batch_workers = batch_workers
+        self.addresses = TTLCache()
+        self.domains = TTLCache()
+
+    def _lookup(self, email):
+        from requests import RequestException
+        try:
+            response = self.session.get(
+                self.api_url,
+                params={'email': email, 'api_key': self.api_key},
+                timeout=TIMEOUT
+            )
+            data = response.json().get('data', {}) if response.status_code == 200 else None
+        except (RequestException, ValueError):
+            data = None
+        if data is None:
+            return False
+
+        deliverable = data.get('result') == 'deliverable'
+        self.addresses.set(email, deliverable, self.positive_ttl if deliverable else self.negative_ttl)
+        if data.get('mx_records') is False:
+            self.domains.set(email.rpartition('@')[2], False, self.domain_ttl)
+        return deliverable
+
+    def _cached(self, email):
+        if self.domains.get(email.rpartition('@')[2]) is False:
+            return False
+        return self.addresses.get(email)
+
+    def is_real(self, email):
+        email = normalize_email(email)
+        cached = self._cached(email)
+        if cached is not None:
+            return cached
+        return self._lookup(email)
+
+    def validate_many(self, emails):
+        """Return {email: deliverable} for a batch, asking the API only for unseen addresses."""
+        results = {}
+        pending = {}
+        for email in emails:
+            normalized = normalize_email(email)
+            cached = self._cached(normalized)
+            if cached is not None:
+                results[email] = cached
+            else:
+                pending.setdefault(normalized, []).append(email)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.batch_workers, len(pending))) as executor:
+                # A domain found to lack MX records mid-batch short-circuits the rest of it
+                for normalized, deliverable in zip(pending, executor.map(self.is_real, pending)):
+                    for email in pending[normalized]:
+                        results[email] = deliverable
+        return results
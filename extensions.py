@@ -0,0 +1,6 @@
+from flask_cors import CORS
+from flask_jwt_extended import JWTManager
+
+# Shared by every app create_app builds; bound to each in init_app
+jwt = JWTManager()
+cors = CORS()
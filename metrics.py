@@ -0,0 +1,375 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from flask import Response, g, has_request_context, request
+from flask_restful.representations.json import output_json
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 1.0))
+MAX_LOGGED_QUERIES = 50
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+# A directory every gunicorn worker can write to; set it and each scrape sums all the workers
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 1.0))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+slow_log = logging.getLogger('slow_requests')
+logger = logging.getLogger(__name__)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self, samples=None):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for key, value in sorted((self.samples() if samples is None else samples).items()):
+            lines.append(f'{self.name}{format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One count per bucket, then the running sum and total count
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    def render(self, samples=None):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        names = self.labels + ('le',)
+        for key, series in sorted((self.samples() if samples is None else samples).items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{format_labels(names, key + (bound,))} {count}')
+            lines.append(f'{self.name}_bucket{format_labels(names, key + ("+Inf",))} {series[-1]}')
+            lines.append(f'{self.name}_sum{format_labels(self.labels, key)} {series[-2]}')
+            lines.append(f'{self.name}_count{format_labels(self.labels, key)} {series[-1]}')
+        return lines
+
+
+class Gauge:
+    """A value read when /metrics is scraped; collect() returns {label values: value}."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels, collect):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def samples(self):
+        return self.collect()
+
+    def render(self, samples=None, labels=None):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        for key, value in sorted((self.samples() if samples is None else samples).items()):
+            lines.append(f'{self.name}{format_labels(labels or self.labels, key)} {value}')
+        return lines
+
+
+class Registry:
+    """The metrics of this process, rendered in Prometheus text format.
+
+    Without a directory a scrape sees only the process that answered it.
+    With one, each process also writes its samples to a file of its own
+    there, every flush_every seconds and when it exits, and a scrape adds
+    up every file: counters and histograms are summed across workers, and
+    the files of recycled workers are kept so totals never go backwards.
+    Gauges describe a live process, so they get a pid label and are only
+    read from files written within the last few flushes. Empty the
+    directory when the service itself restarts.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.directory = None
+        self.flush_every = METRICS_FLUSH_SECONDS
+        self._pid = None
+        self._path = None
+        self._flushing_pid = None
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        if self.directory is None:
+            lines = [line for metric in self.metrics for line in metric.render()]
+        else:
+            self.write()
+            lines = self._render_files()
+        return '\n'.join(lines) + '\n'
+
+    def _file(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._path = None
+        if self._path is None or os.path.dirname(self._path) != self.directory:
+            # The random part keeps a reused pid from overwriting a recycled worker's totals
+            self._path = os.path.join(self.directory, f'metrics_{self._pid}_{uuid.uuid4().hex}.json')
+        return self._path
+
+    def write(self):
+        """Write this process's samples to its file in the directory."""
+        with self._lock:
+            path = self._file()
+            samples = {metric.name: [[list(key), value] for key, value in metric.samples().items()] for metric in self.metrics}
+            with open(f'{path}.tmp', 'w') as file:
+                json.dump({'pid': self._pid, 'samples': samples}, file, separators=(',', ':'))
+            os.replace(f'{path}.tmp', path)
+
+    def _read_files(self):
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+                yield data, time.time() - os.path.getmtime(path)
+            except (OSError, ValueError):
+                # Removed or replaced between the glob and the read
+                continue
+
+    def _render_files(self):
+        totals = {metric.name: {} for metric in self.metrics}
+        fresh = max(3 * self.flush_every, 5)
+        for data, age in self._read_files():
+            for metric in self.metrics:
+                series = totals[metric.name]
+                for key, value in data['samples'].get(metric.name, ()):
+                    key = tuple(key)
+                    if metric.kind == 'gauge':
+                        if age <= fresh:
+                            series[key + (data['pid'],)] = value
+                    elif metric.kind == 'histogram':
+                        total = series.setdefault(key, [0] * len(value))
+                        series[key] = [a + b for a, b in zip(total, value)]
+                    else:
+                        series[key] = series.get(key, 0) + value
+
+        lines = []
+        for metric in self.metrics:
+            if metric.kind == 'gauge':
+                lines.extend(metric.render(totals[metric.name], labels=metric.labels + ('pid',)))
+            else:
+                lines.extend(metric.render(totals[metric.name]))
+        return lines
+
+    def start_flushing(self):
+        """Keep this process's file current; once per process, as threads do not survive a fork."""
+        if self.directory is None or self._flushing_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flushing_pid == os.getpid():
+                return
+            self._flushing_pid = os.getpid()
+        threading.Thread(target=self._flush_forever, name='metrics-flush', daemon=True).start()
+        atexit.register(self._flush)
+
+    def _flush(self):
+        if self.directory is None:
+            return
+        try:
+            self.write()
+        except OSError:
+            logger.exception('Could not write metrics to %s', self.directory)
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_every)
+            self._flush()
+
+
+registry = Registry()
+
+request_seconds = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time spent handling a request.', ('method', 'endpoint', 'status')))
+request_queries = registry.register(Histogram(
+    'http_request_sql_queries', 'SQL statements executed per request.', ('endpoint',), COUNT_BUCKETS))
+request_sql_seconds = registry.register(Histogram(
+    'http_request_sql_duration_seconds', 'Time spent in SQL per request.', ('endpoint',)))
+request_serialization_seconds = registry.register(Histogram(
+    'http_request_serialization_duration_seconds', 'Time spent turning models into JSON per request.', ('endpoint',)))
+request_outbound_seconds = registry.register(Histogram(
+    'http_request_outbound_duration_seconds', 'Time spent waiting on outbound HTTP calls per request.', ('endpoint',)))
+outbound_seconds = registry.register(Histogram(
+    'outbound_http_request_duration_seconds', 'Outbound HTTP calls to M-Pesa and the email validation API.', ('host', 'status')))
+slow_requests = registry.register(Counter(
+    'http_slow_requests_total', 'Requests slower than SLOW_REQUEST_SECONDS.', ('endpoint',)))
+
+
+def current_stats():
+    """The per-request tally, or None outside a request (worker threads, CLI commands)."""
+    if not has_request_context():
+        return None
+    return g.get('request_stats')
+
+
+@contextmanager
+def track_serialization():
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_stats()
+        if stats is not None:
+            stats['serialization'] += time.perf_counter() - start
+
+
+def timed_output_json(data, code, headers=None):
+    """flask-restful's JSON representation, counted as serialisation time."""
+    with track_serialization():
+        return output_json(data, code, headers)
+
+
+def record_outbound(response, *args, **kwargs):
+    """A requests response hook; elapsed runs from sending the request to parsing the response headers."""
+    elapsed = response.elapsed.total_seconds()
+    outbound_seconds.observe(elapsed, host=urlsplit(response.url).netloc, status=response.status_code)
+    stats = current_stats()
+    if stats is not None:
+        stats['outbound'] += elapsed
+    return response
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    stats = current_stats()
+    if stats is None:
+        return
+    stats['queries'] += 1
+    stats['sql'] += elapsed
+    if len(stats['statements']) < MAX_LOGGED_QUERIES:
+        stats['statements'].append((statement, elapsed))
+
+
+def endpoint_label():
+    # The rule ('/rooms/<int:id>') rather than the path keeps label values few
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def start_request():
+    registry.start_flushing()
+    g.request_stats = {
+        'start': time.perf_counter(),
+        'queries': 0,
+        'sql': 0.0,
+        'serialization': 0.0,
+        'outbound': 0.0,
+        'statements': [],
+    }
+
+
+def finish_request(response):
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return response
+
+    elapsed = time.perf_counter() - stats['start']
+    endpoint = endpoint_label()
+    request_seconds.observe(elapsed, method=request.method, endpoint=endpoint, status=response.status_code)
+    request_queries.observe(stats['queries'], endpoint=endpoint)
+    request_sql_seconds.observe(stats['sql'], endpoint=endpoint)
+    request_serialization_seconds.observe(stats['serialization'], endpoint=endpoint)
+    request_outbound_seconds.observe(stats['outbound'], endpoint=endpoint)
+
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        slow_requests.inc(endpoint=endpoint)
+        slow_log.warning(json.dumps({
+            'method': request.method,
+            'path': request.full_path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'seconds': round(elapsed, 4),
+            'sql_seconds': round(stats['sql'], 4),
+            'serialization_seconds': round(stats['serialization'], 4),
+            'outbound_seconds': round(stats['outbound'], 4),
+            'query_count': stats['queries'],
+            'queries': [{'sql': statement, 'ms': round(seconds * 1000, 2)} for statement, seconds in stats['statements']],
+        }))
+    return response
+
+
+def metrics_view():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    """Time every request and serve the totals on /metrics.
+
+    Under gunicorn, set METRICS_MULTIPROC_DIR to a directory the workers
+    share, so that any of them answers a scrape with the totals of all;
+    without it each scrape sees only the worker that answered. Streaming
+    responses are timed up to the first byte.
+    """
+    directory = app.config.setdefault('METRICS_MULTIPROC_DIR', METRICS_MULTIPROC_DIR)
+    registry.flush_every = app.config.setdefault('METRICS_FLUSH_SECONDS', METRICS_FLUSH_SECONDS)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        registry.directory = directory
+
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
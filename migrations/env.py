@@ -45,6 +45,18 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# Full-text search tables are created by hand in edfe7294fd55 (an FTS5 table and
+# its shadow tables on SQLite, search_document on PostgreSQL) and have no model,
+# so autogenerate would otherwise drop them
+SEARCH_TABLES = ('search_document', 'search_index')
+
+
+def include_name(name, type_, parent_names):
+    if type_ == 'table':
+        return name not in SEARCH_TABLES and not name.startswith('search_index_')
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +77,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_name=include_name
     )
 
     with context.begin_transaction():
@@ -93,6 +106,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_name", include_name)
 
     connectable = get_engine()
 
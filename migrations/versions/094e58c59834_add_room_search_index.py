@@ -0,0 +1,26 @@
+"""add room search index
+
+Revision ID: 094e58c59834
+Revises: c71658bf6361
+Create Date: 2026-10-17 15:47:29.118374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '094e58c59834'
+down_revision = 'c71658bf6361'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.create_index('ix_rooms_accommodation_price_type', ['accommodation_id', 'price', 'room_type'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.drop_index('ix_rooms_accommodation_price_type')
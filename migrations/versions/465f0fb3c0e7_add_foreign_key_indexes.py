@@ -0,0 +1,53 @@
+"""index foreign keys and enforce unique room numbers
+
+Revision ID: 465f0fb3c0e7
+Revises: 65715a69c5e4
+Create Date: 2026-10-17 19:41:08.527713
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '465f0fb3c0e7'
+down_revision = '65715a69c5e4'
+branch_labels = None
+depends_on = None
+
+# (table, column) for every foreign key no existing index leads with
+FOREIGN_KEY_INDEXES = (
+    ('booking', 'user_id'),
+    ('booking', 'accommodation_id'),
+    ('reviews', 'user_id'),
+    ('payments', 'booking_id'),
+    ('payment_job', 'booking_id'),
+    ('user_verification', 'user_id'),
+    ('password_reset', 'user_id'),
+)
+
+
+def upgrade():
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT accommodation_id, room_no, count(*) FROM rooms "
+        "GROUP BY accommodation_id, room_no HAVING count(*) > 1"
+    )).fetchall()
+    if duplicates:
+        listed = ', '.join(f'accommodation {accommodation_id} room {room_no} (x{count})' for accommodation_id, room_no, count in duplicates)
+        raise RuntimeError(f'Renumber or remove duplicate rooms before adding _room_accommodation_uc: {listed}')
+
+    for table, column in FOREIGN_KEY_INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(f'ix_{table}_{column}', [column], unique=False)
+
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.create_unique_constraint('_room_accommodation_uc', ['room_no', 'accommodation_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('rooms', schema=None) as batch_op:
+        batch_op.drop_constraint('_room_accommodation_uc', type_='unique')
+
+    for table, column in reversed(FOREIGN_KEY_INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_{column}')
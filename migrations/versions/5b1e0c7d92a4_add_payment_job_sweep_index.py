@@ -0,0 +1,26 @@
+"""add payment job sweep index
+
+Revision ID: 5b1e0c7d92a4
+Revises: 465f0fb3c0e7
+Create Date: 2026-10-17 16:12:40.218374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e0c7d92a4'
+down_revision = '465f0fb3c0e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payment_job', schema=None) as batch_op:
+        batch_op.create_index('ix_payment_job_status_updated_at', ['status', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payment_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_job_status_updated_at')
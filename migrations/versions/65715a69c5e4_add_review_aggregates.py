@@ -0,0 +1,59 @@
+"""attach reviews to accommodations and add rating aggregates
+
+Revision ID: 65715a69c5e4
+Revises: edfe7294fd55
+Create Date: 2026-10-17 17:12:40.981532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '65715a69c5e4'
+down_revision = 'edfe7294fd55'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('accommodation_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_reviews_accommodation_id_accommodations', 'accommodations', ['accommodation_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('ix_reviews_accommodation_id', ['accommodation_id'], unique=False)
+
+    op.create_table('accommodation_rating',
+    sa.Column('accommodation_id', sa.Integer(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('average_rating', sa.Float(), nullable=False),
+    sa.Column('rating_1', sa.Integer(), nullable=False),
+    sa.Column('rating_2', sa.Integer(), nullable=False),
+    sa.Column('rating_3', sa.Integer(), nullable=False),
+    sa.Column('rating_4', sa.Integer(), nullable=False),
+    sa.Column('rating_5', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['accommodation_id'], ['accommodations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('accommodation_id')
+    )
+    with op.batch_alter_table('accommodation_rating', schema=None) as batch_op:
+        batch_op.create_index('ix_accommodation_rating_average_rating', ['average_rating'], unique=False)
+
+    # Existing reviews are not linked to any accommodation yet, so every aggregate starts empty
+    op.execute(
+        "INSERT INTO accommodation_rating "
+        "(accommodation_id, review_count, rating_sum, average_rating, rating_1, rating_2, rating_3, rating_4, rating_5, updated_at) "
+        "SELECT id, 0, 0, 0, 0, 0, 0, 0, 0, CURRENT_TIMESTAMP FROM accommodations"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('accommodation_rating', schema=None) as batch_op:
+        batch_op.drop_index('ix_accommodation_rating_average_rating')
+
+    op.drop_table('accommodation_rating')
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_accommodation_id')
+        batch_op.drop_constraint('fk_reviews_accommodation_id_accommodations', type_='foreignkey')
+        batch_op.drop_column('accommodation_id')
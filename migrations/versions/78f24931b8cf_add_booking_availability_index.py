@@ -0,0 +1,26 @@
+"""add booking availability index
+
+Revision ID: 78f24931b8cf
+Revises: 2e3dd14c3414
+Create Date: 2026-10-17 09:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '78f24931b8cf'
+down_revision = '2e3dd14c3414'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_room_dates_status', ['room_id', 'start_date', 'end_date', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_index('ix_booking_room_dates_status')
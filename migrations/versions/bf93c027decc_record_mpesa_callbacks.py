@@ -0,0 +1,44 @@
+"""record mpesa callbacks in payments
+
+Revision ID: bf93c027decc
+Revises: cf6cfa909891
+Create Date: 2026-10-17 14:21:37.046512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bf93c027decc'
+down_revision = 'cf6cfa909891'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('mpesa_receipt_number', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('phone_number', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('checkout_request_id', sa.String(length=100), nullable=True))
+        batch_op.alter_column('booking_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.create_unique_constraint('uq_payments_mpesa_receipt_number', ['mpesa_receipt_number'])
+
+    with op.batch_alter_table('payment_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('booking_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_payment_job_booking_id_booking', 'booking', ['booking_id'], ['id'])
+        batch_op.create_index('ix_payment_job_checkout_request_id', ['checkout_request_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payment_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_job_checkout_request_id')
+        batch_op.drop_constraint('fk_payment_job_booking_id_booking', type_='foreignkey')
+        batch_op.drop_column('booking_id')
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_payments_mpesa_receipt_number', type_='unique')
+        batch_op.alter_column('booking_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_column('checkout_request_id')
+        batch_op.drop_column('phone_number')
+        batch_op.drop_column('mpesa_receipt_number')
@@ -0,0 +1,26 @@
+"""add accommodation location index
+
+Revision ID: c71658bf6361
+Revises: bf93c027decc
+Create Date: 2026-10-17 15:08:12.663940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71658bf6361'
+down_revision = 'bf93c027decc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('accommodations', schema=None) as batch_op:
+        batch_op.create_index('ix_accommodations_lat_lng', ['latitude', 'longitude'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('accommodations', schema=None) as batch_op:
+        batch_op.drop_index('ix_accommodations_lat_lng')
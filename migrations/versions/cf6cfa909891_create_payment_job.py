@@ -0,0 +1,34 @@
+"""create payment_job table
+
+Revision ID: cf6cfa909891
+Revises: e839df29235d
+Create Date: 2026-10-17 13:02:51.804127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cf6cfa909891'
+down_revision = 'e839df29235d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payment_job',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('phone_number', sa.String(length=20), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('checkout_request_id', sa.String(length=100), nullable=True),
+    sa.Column('response', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('payment_job')
@@ -0,0 +1,51 @@
+"""create full-text search index
+
+Revision ID: edfe7294fd55
+Revises: 094e58c59834
+Create Date: 2026-10-17 16:30:55.274016
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'edfe7294fd55'
+down_revision = '094e58c59834'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE TABLE search_document ("
+            "kind VARCHAR(20) NOT NULL, "
+            "ref INTEGER NOT NULL, "
+            "body TEXT NOT NULL, "
+            "document TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', body)) STORED, "
+            "PRIMARY KEY (kind, ref))"
+        )
+        op.execute("CREATE INDEX ix_search_document_document ON search_document USING GIN (document)")
+        op.execute(
+            "INSERT INTO search_document (kind, ref, body) "
+            "SELECT 'accommodation', id, name || ' ' || description FROM accommodations "
+            "UNION ALL SELECT 'room', id, room_type || ' ' || description FROM rooms "
+            "UNION ALL SELECT 'review', id, COALESCE(content, '') FROM reviews"
+        )
+    else:
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(body, tokenize='porter unicode61')")
+        # rowid = id * 8 + kind code (1 accommodation, 2 room, 3 review), matching search.py
+        op.execute(
+            "INSERT INTO search_index (rowid, body) "
+            "SELECT id * 8 + 1, name || ' ' || description FROM accommodations "
+            "UNION ALL SELECT id * 8 + 2, room_type || ' ' || description FROM rooms "
+            "UNION ALL SELECT id * 8 + 3, COALESCE(content, '') FROM reviews"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_table('search_document')
+    else:
+        op.execute("DROP TABLE IF EXISTS search_index")
@@ -1,10 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy 
 from sqlalchemy_serializer import SerializerMixin
 from sqlalchemy import UniqueConstraint
-from flask_marshmallow import Marshmallow
+from datetime import datetime
+from replicas import RoutingSession
 
-db = SQLAlchemy()
-ma = Marshmallow()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # User Model
 class User(db.Model, SerializerMixin):
@@ -31,7 +31,8 @@ class Reviews(db.Model, SerializerMixin):
     id = db.Column(db.Integer, primary_key=True)
     rating = db.Column(db.Integer, nullable=False)
     content = db.Column(db.Text, nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    accommodation_id = db.Column(db.Integer, db.ForeignKey('accommodations.id', ondelete='SET NULL'), nullable=True, index=True)
 
     # Relationship to User
     user = db.relationship('User', back_populates='reviews')
@@ -44,7 +45,7 @@ class Reviews(db.Model, SerializerMixin):
     
     
 class Accommodations(db.Model, SerializerMixin):
-    _tablename_ = 'accommodations'
+    __tablename__ = 'accommodations'
 
     id = db.Column(db.Integer, primary_key=True, unique=True)
     name = db.Column(db.String(100), nullable=False)
@@ -53,11 +54,15 @@ class Accommodations(db.Model, SerializerMixin):
     
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=db.func.current_timestamp())
 
     bookings = db.relationship('Booking', back_populates='accommodations', lazy=True)
     rooms = db.relationship('Rooms', back_populates='accommodations', cascade="all, delete", passive_deletes=True, lazy=True)
+    rating = db.relationship('Accommodation_rating', uselist=False, viewonly=True, lazy=True)
 
-    serialize_rules = ('-bookings', '-rooms',)
+    __table_args__ = (db.Index('ix_accommodations_lat_lng', 'latitude', 'longitude'),)
+
+    serialize_rules = ('-bookings', '-rooms', '-rating')
 
     def _repr_(self):
         return f"Accommodations('{self.name}', '{self.latitude}', '{self.longitude}', '{self.image}', '{self.description}')"
@@ -72,18 +77,24 @@ class Rooms(db.Model, SerializerMixin):
     availability = db.Column(db.Boolean, default=True)
     image = db.Column(db.String, nullable=False)
     description = db.Column(db.String, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=db.func.current_timestamp())
 
     accommodations = db.relationship('Accommodations', back_populates='rooms', lazy=True)
     bookings = db.relationship('Booking', back_populates='room', lazy=True)
 
-    _table_args_ = (UniqueConstraint('room_no', 'accommodation_id', name='_room_accommodation_uc'),)
+    # ix_rooms_accommodation_price_type leads with accommodation_id, so it also serves the foreign key
+    __table_args__ = (
+        UniqueConstraint('room_no', 'accommodation_id', name='_room_accommodation_uc'),
+        db.Index('ix_rooms_accommodation_price_type', 'accommodation_id', 'price', 'room_type'),
+    )
 
     serialize_rules = ('-accommodations.rooms', '-bookings')
     
 class Booking(db.Model, SerializerMixin):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    accommodation_id = db.Column(db.Integer, db.ForeignKey('accommodations.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    accommodation_id = db.Column(db.Integer, db.ForeignKey('accommodations.id'), nullable=False, index=True)
+    # room_id is covered by ix_booking_room_dates_status
     room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), nullable=False)
     start_date = db.Column(db.DateTime, nullable=False)
     end_date = db.Column(db.DateTime, nullable=False)
@@ -94,6 +105,8 @@ class Booking(db.Model, SerializerMixin):
     room = db.relationship('Rooms', back_populates='bookings', lazy=True)
     payments = db.relationship('Payments', back_populates='book', lazy=True)
 
+    __table_args__ = (db.Index('ix_booking_room_dates_status', 'room_id', 'start_date', 'end_date', 'status'),)
+
     serialize_rules = ('-user.bookings', '-payments', '-accommodations.bookings', '-room.bookings')
 
     def _repr_(self):
@@ -101,12 +114,15 @@ class Booking(db.Model, SerializerMixin):
 
 
 class Payments(db.Model, SerializerMixin):
-    _tablename_ = 'payments'
+    __tablename__ = 'payments'
 
     id = db.Column(db.Integer, primary_key = True, unique = True)
-    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=True, index=True)
     payment_amount = db.Column(db.Integer, nullable=False)
     payment_date = db.Column(db.DateTime, nullable=False)
+    mpesa_receipt_number = db.Column(db.String(50), unique=True, nullable=True)
+    phone_number = db.Column(db.String(20), nullable=True)
+    checkout_request_id = db.Column(db.String(100), nullable=True)
 
 
     book = db.relationship('Booking', back_populates = 'payments', lazy = True)
@@ -119,10 +135,10 @@ class Payments(db.Model, SerializerMixin):
         return f"Payment('{self.booking_id}', '{self.payment_amount}')"
     
 class User_verification(db.Model, SerializerMixin):
-    _tablename_ = 'user_verification'
+    __tablename__ = 'user_verification'
 
     id = db.Column(db.Integer, primary_key = True, unique = True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     status = db.Column(db.String(50), nullable=False)
     
 
@@ -133,10 +149,10 @@ class User_verification(db.Model, SerializerMixin):
 
 
 class Password_reset(db.Model, SerializerMixin):
-    _tablename_ = 'password_reset'
+    __tablename__ = 'password_reset'
 
     id = db.Column(db.Integer, primary_key = True, unique = True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     reset_token = db.Column(db.String(100), nullable=False)
     reset_expires = db.Column(db.DateTime, nullable=False)
     
@@ -148,4 +164,37 @@ class Password_reset(db.Model, SerializerMixin):
 
 
     def _repr_(self):
-        return f"Password_reset('{self.user_id}', '{self.reset_token}')"
\ No newline at end of file
+        return f"Password_reset('{self.user_id}', '{self.reset_token}')"
+
+class Payment_job(db.Model, SerializerMixin):
+    id = db.Column(db.String(32), primary_key = True)
+    phone_number = db.Column(db.String(20), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    checkout_request_id = db.Column(db.String(100), nullable=True, index=True)
+    response = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # For the sweep of jobs stuck in queued/processing
+    __table_args__ = (db.Index('ix_payment_job_status_updated_at', 'status', 'updated_at'),)
+
+    def _repr_(self):
+        return f"Payment_job('{self.id}', '{self.status}')"
+
+
+class Accommodation_rating(db.Model, SerializerMixin):
+    accommodation_id = db.Column(db.Integer, db.ForeignKey('accommodations.id', ondelete='CASCADE'), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    average_rating = db.Column(db.Float, nullable=False, default=0.0, index=True)
+    rating_1 = db.Column(db.Integer, nullable=False, default=0)
+    rating_2 = db.Column(db.Integer, nullable=False, default=0)
+    rating_3 = db.Column(db.Integer, nullable=False, default=0)
+    rating_4 = db.Column(db.Integer, nullable=False, default=0)
+    rating_5 = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def _repr_(self):
+        return f"Accommodation_rating('{self.accommodation_id}', '{self.average_rating}', '{self.review_count}')"
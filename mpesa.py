@@ -0,0 +1,117 @@
+import base64
+import datetime
+import threading
+import time
+
+import requests
+
+# (connect, read) timeouts in seconds for every call to the gateway
+TIMEOUT = (3.05, 15)
+
+
+class TokenManager:
+    """Caches the OAuth access token until shortly before it expires.
+
+    Refreshes happen under a lock with a second check inside it, so a burst
+    of payments after expiry triggers a single call to the OAuth endpoint.
+    """
+
+    def __init__(self, session, url, consumer_key, consumer_secret, refresh_margin=60):
+        self.session = session
+        self.url = url
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def _valid(self):
+        return self._token and time.monotonic() < self._expires_at - self.refresh_margin
+
+    def get(self):
+        if self._valid():
+            return self._token
+
+        with self._lock:
+            if self._valid():
+                return self._token
+
+            try:
+                response = self.session.get(self.url, auth=(self.consumer_key, self.consumer_secret), timeout=TIMEOUT)
+            except requests.RequestException:
+                return None
+            if response.status_code != 200:
+                return None
+
+            data = response.json()
+            self._token = data.get('access_token')
+            self._expires_at = time.monotonic() + int(data.get('expires_in', 3599))
+            return self._token
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._expires_at = 0
+
+
+def generate_password(shortcode, passkey, timestamp):
+    data_to_encode = f'{shortcode}{passkey}{timestamp}'
+    return base64.b64encode(data_to_encode.encode()).decode('utf-8')
+
+def get_timestamp():
+    return datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+
+
+class MpesaGateway:
+    """Sends STK push requests to Safaricom (Daraja) using a shared session and token manager."""
+
+    def __init__(self, session, tokens, stk_push_url, shortcode, passkey, callback_url):
+        self.session = session
+        self.tokens = tokens
+        self.stk_push_url = stk_push_url
+        self.shortcode = shortcode
+        self.passkey = passkey
+        self.callback_url = callback_url
+
+    def stk_push(self, phone_number, amount):
+        """Return (ok, data) for one STK push; data is the gateway reply or an error message."""
+        access_token = self.tokens.get()
+        if not access_token:
+            return False, {'error' : 'Failed to get mpesa access token!'}
+
+        headers = {
+            'Authorization' : f'Bearer {access_token}',
+            'Content-Type' : 'application/json'
+        }
+
+        timestamp = get_timestamp()
+        password = generate_password(self.shortcode, self.passkey, timestamp)
+
+        payload = {
+            "BusinessShortCode" : self.shortcode,
+            "Password" : password,
+            "Timestamp" : timestamp,
+            "TransactionType" : "CustomerPayBillOnline",
+            "Amount" : amount,
+            "PartyA" : phone_number,
+            "PartyB" : self.shortcode,
+            "PhoneNumber" : phone_number,
+            "CallBackURL" : self.callback_url,
+            "AccountReference" : "12345678",
+            "TransactionDesc" : "Payment for abc"
+        }
+
+        try:
+            response = self.session.post(self.stk_push_url, json=payload, headers=headers, timeout=TIMEOUT)
+        except requests.RequestException:
+            return False, {'error' : 'Failed to reach the mpesa gateway!'}
+
+        if response.status_code == 401:
+            self.tokens.invalidate()
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = {'error' : response.text}
+        return response.status_code == 200, data
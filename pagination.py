@@ -0,0 +1,50 @@
+from flask import request
+from sqlalchemy import and_, or_
+
+from metrics import track_serialization
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_sort_cursor(cursor):
+    value, _, id = (cursor or '').rpartition(':')
+    try:
+        return float(value), int(id)
+    except ValueError:
+        return None
+
+
+def paginate(query, model, serialize, sort_column=None, sort_value=None):
+    """Return one keyset page of query as {'items': [...], 'next_cursor': cursor or None}.
+
+    Pages are ordered by model.id; ?cursor= is the last id of the previous
+    page and ?limit= is capped at MAX_PAGE_SIZE. With sort_column, pages are
+    ordered by that column descending and then by id, and the cursor becomes
+    '<value>:<id>' with the value read from the last row by sort_value(row).
+    """
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if sort_column is None:
+        cursor = request.args.get('cursor', type=int)
+        if cursor is not None:
+            query = query.filter(model.id > cursor)
+        rows = query.order_by(model.id).limit(limit + 1).all()
+        cursor_of = lambda row: row.id
+    else:
+        cursor = parse_sort_cursor(request.args.get('cursor'))
+        if cursor is not None:
+            value, id = cursor
+            query = query.filter(or_(sort_column < value, and_(sort_column == value, model.id > id)))
+        rows = query.order_by(sort_column.desc(), model.id).limit(limit + 1).all()
+        cursor_of = lambda row: f'{sort_value(row)!r}:{row.id}'
+
+    next_cursor = cursor_of(rows[limit - 1]) if len(rows) > limit else None
+
+    with track_serialization():
+        items = [serialize(row) for row in rows[:limit]]
+    return {
+        'items': items,
+        'next_cursor': next_cursor
+    }
@@ -0,0 +1,143 @@
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+from werkzeug.security import check_password_hash
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', HASH_WORKERS * 4))
+HASH_TIMEOUT = 10
+RETRY_AFTER = 1
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool already has as much work queued as it accepts,
+    or is too far behind to finish a hash within HASH_TIMEOUT."""
+
+
+def is_strong_password(password):
+    return bool(re.match(r"^(?=.*[A-Za-z])(?=.*\d)[A-Za-z\d@$!%*?&]{8,}$", password))
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def hash_scheme(hashed):
+    """Name the scheme that produced a stored hash: 'bcrypt', 'werkzeug' or None if unknown."""
+    if not hashed:
+        return None
+    if hashed.startswith(('$2a$', '$2b$', '$2y$')):
+        return 'bcrypt'
+    if hashed.startswith(('pbkdf2:', 'scrypt:')):
+        return 'werkzeug'
+    return None
+
+
+def _verify(hashed, password):
+    scheme = hash_scheme(hashed)
+    if scheme == 'bcrypt':
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    if scheme == 'werkzeug':
+        return check_password_hash(hashed, password)
+    return False
+
+
+def hash_rounds(hashed):
+    """The cost factor stored in a bcrypt hash ('$2b$12$...' -> 12)."""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Runs bcrypt in a process pool so hashing never competes with request threads for the GIL.
+
+    At most max_pending hashes may be queued or running. Past that, calls
+    raise HasherBusy at once instead of piling up behind a login storm.
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS, max_pending=HASH_QUEUE):
+        self.rounds = rounds
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Each forked gunicorn worker builds its own pool on first use
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _submit(self, fn, *args, wait=False):
+        if not self._slots.acquire(blocking=wait, timeout=HASH_TIMEOUT if wait else None):
+            raise HasherBusy()
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=HASH_TIMEOUT)
+        except FutureTimeout:
+            raise HasherBusy()
+
+    def _run(self, fn, *args):
+        return self._result(self._submit(fn, *args))
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def hash_many(self, passwords):
+        """Hash a batch one pool-width at a time, waiting for free slots.
+
+        Interactive hashes keep their place in between windows, so a bulk
+        import slows logins down rather than locking them out.
+        """
+        hashes = []
+        for start in range(0, len(passwords), self.workers):
+            futures = [self._submit(_hash, password, self.rounds, wait=True) for password in passwords[start:start + self.workers]]
+            hashes.extend(self._result(future) for future in futures)
+        return hashes
+
+    def verify(self, hashed, password):
+        return self._run(_verify, hashed, password)
+
+    def needs_rehash(self, hashed):
+        return hash_scheme(hashed) != 'bcrypt' or hash_rounds(hashed) != self.rounds
+
+    def check_user(self, user, password):
+        """Verify a user's password, upgrading a legacy or outdated hash on success.
+
+        The upgraded hash is left on the session for the caller to commit. If the
+        pool is busy by then, the upgrade waits for a later login rather than
+        turning away a correct password.
+        """
+        if not user or not password or not self.verify(user.password, password):
+            return False
+        if self.needs_rehash(user.password):
+            try:
+                user.password = self.hash(password)
+            except HasherBusy:
+                pass
+        return True
+
+
+hasher = PasswordHasher()
+
+
+def busy_response():
+    return {'error': 'The server is busy, please try again shortly.'}, 503, {'Retry-After': str(RETRY_AFTER)}
@@ -0,0 +1,232 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy.exc import DataError, IntegrityError, OperationalError
+
+from models import db, Payments, Payment_job
+
+logger = logging.getLogger(__name__)
+
+# Payments.mpesa_receipt_number is a String(50)
+MAX_RECEIPT_LENGTH = 50
+
+# Raised by a record the database will never take; the rest of its batch is still written
+BAD_RECORD_ERRORS = (IntegrityError, DataError, ValueError, TypeError)
+
+CallbackRecord = namedtuple(
+    'CallbackRecord',
+    'checkout_request_id result_code result_desc amount receipt phone transaction_date'
+)
+
+
+def parse_callback(data):
+    """Flatten a Daraja stkCallback body into a CallbackRecord.
+
+    Raises KeyError when the body is malformed or a successful payment lacks
+    its metadata, and ValueError when its amount or receipt number could not
+    be stored, so the callback is refused before Safaricom is told it was accepted.
+    """
+    callback = data['Body']['stkCallback']
+    items = {item['Name']: item.get('Value') for item in callback.get('CallbackMetadata', {}).get('Item', [])}
+    record = CallbackRecord(
+        checkout_request_id=callback.get('CheckoutRequestID'),
+        result_code=callback['ResultCode'],
+        result_desc=callback['ResultDesc'],
+        amount=items.get('Amount'),
+        receipt=items.get('MpesaReceiptNumber'),
+        phone=items.get('PhoneNumber'),
+        transaction_date=items.get('TransactionDate')
+    )
+    if record.result_code != 0:
+        return record
+    if record.amount is None or not record.receipt:
+        raise KeyError('CallbackMetadata')
+    return record._replace(amount=parse_amount(record.amount), receipt=parse_receipt(record.receipt))
+
+
+def parse_amount(value):
+    """Daraja sends whole shillings, as 1 or 1.0; anything else is refused."""
+    if isinstance(value, bool):
+        raise ValueError(f'invalid amount {value!r}')
+    amount = float(value)
+    if not amount.is_integer() or amount <= 0:
+        raise ValueError(f'invalid amount {value!r}')
+    return int(amount)
+
+
+def parse_receipt(value):
+    if not isinstance(value, str) or len(value) > MAX_RECEIPT_LENGTH:
+        raise ValueError(f'invalid receipt number {value!r}')
+    return value
+
+
+def parse_transaction_date(value):
+    try:
+        return datetime.strptime(str(value), '%Y%m%d%H%M%S')
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+def callback_log(path='mpesa_callback.log', max_bytes=10 * 1024 * 1024, backups=5):
+    """A logger that appends one compact JSON line per callback to a rotating file."""
+    log = logging.getLogger('mpesa.callbacks')
+    if not log.handlers:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, delay=True)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    return log
+
+
+class CallbackWriter:
+    """Buffers parsed callbacks and writes them to Payments in batched transactions.
+
+    A background thread flushes every batch_size records or flush_interval
+    seconds, whichever comes first. Writes are idempotent on the M-Pesa
+    receipt number, so gateway retries never create duplicate payments.
+
+    A batch the database turns down is written again one record at a time,
+    so a bad record only costs its own row. If the database cannot be
+    reached, the batch goes back on the queue and is tried again after
+    retry_delay seconds.
+    """
+
+    def __init__(self, app, batch_size=100, flush_interval=1.0, retry_delay=5.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def submit(self, record):
+        self._ensure_started()
+        self._queue.put(record)
+
+    def _ensure_started(self):
+        # Started lazily so each forked gunicorn worker gets its own thread
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name='mpesa-callbacks', daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if not self._write_safely(batch):
+                time.sleep(self.retry_delay)
+
+    def flush(self):
+        """Write everything still buffered on the calling thread."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write_safely(batch)
+
+    def _write_safely(self, batch):
+        """Store a batch; False when the database was unreachable and the batch was requeued."""
+        try:
+            with self.app.app_context():
+                try:
+                    self._write(batch)
+                except OperationalError:
+                    return self._requeue(batch)
+                except BAD_RECORD_ERRORS:
+                    # Find the record at fault (or the receipt another worker stored first)
+                    for position, record in enumerate(batch):
+                        try:
+                            self._write_one(record)
+                        except OperationalError:
+                            return self._requeue(batch[position:])
+        except Exception:
+            logger.exception('Failed to store %d mpesa callbacks', len(batch))
+        return True
+
+    def _write_one(self, record):
+        try:
+            try:
+                self._write([record])
+            except IntegrityError:
+                # Stored by another worker since; this time the receipt is seen and skipped
+                self._write([record])
+        except BAD_RECORD_ERRORS:
+            logger.exception('Skipping mpesa callback %s for checkout request %s', record.receipt, record.checkout_request_id)
+
+    def _write(self, records):
+        try:
+            self.write(records)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _requeue(self, records):
+        logger.exception('Database unavailable, requeueing %d mpesa callbacks', len(records))
+        for record in records:
+            self._queue.put(record)
+        return False
+
+    def write(self, records):
+        checkout_ids = {record.checkout_request_id for record in records if record.checkout_request_id}
+        jobs = {
+            job.checkout_request_id: job
+            for job in Payment_job.query.filter(Payment_job.checkout_request_id.in_(checkout_ids))
+        } if checkout_ids else {}
+
+        paid = [record for record in records if record.result_code == 0]
+        receipts = {record.receipt for record in paid}
+        seen = {
+            receipt for (receipt,) in
+            db.session.query(Payments.mpesa_receipt_number).filter(Payments.mpesa_receipt_number.in_(receipts))
+        } if receipts else set()
+
+        rows = []
+        for record in paid:
+            if record.receipt in seen:
+                continue
+            seen.add(record.receipt)
+            job = jobs.get(record.checkout_request_id)
+            rows.append({
+                'booking_id': job.booking_id if job else None,
+                'payment_amount': int(record.amount),
+                'payment_date': parse_transaction_date(record.transaction_date),
+                'mpesa_receipt_number': record.receipt,
+                'phone_number': str(record.phone) if record.phone is not None else None,
+                'checkout_request_id': record.checkout_request_id
+            })
+
+        for record in records:
+            job = jobs.get(record.checkout_request_id)
+            if job:
+                job.status = "paid" if record.result_code == 0 else "failed"
+
+        if rows:
+            db.session.bulk_insert_mappings(Payments, rows)
+        db.session.commit()
+
+
+def log_callback(log, data):
+    log.info(json.dumps({'received_at': datetime.utcnow().isoformat(), 'callback': data}, separators=(',', ':')))
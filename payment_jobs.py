@@ -0,0 +1,110 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from models import db, Payment_job
+
+logger = logging.getLogger(__name__)
+
+INTERRUPTED = {'error': 'The payment was interrupted by a server restart, please try again!'}
+
+
+class PaymentQueue:
+    """Runs STK pushes on a small thread pool so the request thread can return at once.
+
+    Job state lives in the payment_job table, so any worker can answer a
+    status poll. gateway is anything with stk_push(phone_number, amount)
+    returning (ok, data), which lets a fake gateway stand in for Safaricom.
+
+    The pool itself is in memory and dies with its worker, so every
+    sweep_every seconds the table is swept for jobs nobody finished
+    within stale_after seconds; 0 turns the sweeper off.
+    """
+
+    def __init__(self, app, gateway, workers=4, stale_after=300, sweep_every=60):
+        self.app = app
+        self.gateway = gateway
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mpesa')
+        if sweep_every:
+            threading.Thread(target=self._sweep_forever, args=(sweep_every,), name='mpesa-sweep', daemon=True).start()
+
+    def enqueue(self, phone_number, amount, booking_id=None):
+        job = Payment_job(id=uuid.uuid4().hex, phone_number=str(phone_number), amount=amount, booking_id=booking_id, status="queued")
+        db.session.add(job)
+        db.session.commit()
+        return job.id, self._executor.submit(self._run, job.id)
+
+    def _claim(self, job_id):
+        """Move the job from queued to processing; False if another worker got there first."""
+        claimed = Payment_job.query.filter_by(id=job_id, status="queued").update({'status': "processing"}, synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            if not self._claim(job_id):
+                return
+            job = Payment_job.query.get(job_id)
+
+            try:
+                ok, data = self.gateway.stk_push(job.phone_number, job.amount)
+            except Exception:
+                logger.exception("STK push for payment job %s crashed", job_id)
+                ok, data = False, {'error': 'Unexpected error while contacting the mpesa gateway!'}
+
+            job.status = "sent" if ok else "failed"
+            job.checkout_request_id = data.get('CheckoutRequestID')
+            job.response = json.dumps(data)
+            db.session.commit()
+
+    def sweep(self):
+        """Recover jobs left behind by a worker that exited mid-queue (recycle, deploy, crash).
+
+        Queued jobs never reached Safaricom, so they are queued here again and
+        whichever worker claims one first sends it. A job stuck in processing
+        may already have prompted the customer's phone, so it is failed rather
+        than sent twice. Returns (requeued, failed).
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        with self.app.app_context():
+            failed = Payment_job.query.filter(Payment_job.status == "processing", Payment_job.updated_at < cutoff).update(
+                {'status': "failed", 'response': json.dumps(INTERRUPTED)}, synchronize_session=False
+            )
+            stale = [job_id for job_id, in db.session.query(Payment_job.id).filter(Payment_job.status == "queued", Payment_job.updated_at < cutoff)]
+            if stale:
+                # Restart their clock so the next sweep leaves them to this one
+                Payment_job.query.filter(Payment_job.id.in_(stale), Payment_job.status == "queued").update(
+                    {'updated_at': datetime.utcnow()}, synchronize_session=False
+                )
+            db.session.commit()
+
+        for job_id in stale:
+            self._executor.submit(self._run, job_id)
+        if stale or failed:
+            logger.warning("Recovered stale payment jobs: %d requeued, %d failed", len(stale), failed)
+        return len(stale), failed
+
+    def _sweep_forever(self, interval):
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Sweeping stale payment jobs failed")
+            time.sleep(interval)
+
+
+def job_status(job):
+    return {
+        'job_id': job.id,
+        'booking_id': job.booking_id,
+        'status': job.status,
+        'checkout_request_id': job.checkout_request_id,
+        'data': json.loads(job.response) if job.response else None,
+        'created_at': job.created_at.isoformat(),
+        'updated_at': job.updated_at.isoformat()
+    }
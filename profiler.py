@@ -0,0 +1,218 @@
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# off: never; header: only requests sending X-Profile-SQL: 1; always: every request
+SQL_PROFILER = os.getenv('SQL_PROFILER', 'off')
+PROFILE_HEADER = 'X-Profile-SQL'
+EXPLAIN_LIMIT = int(os.getenv('SQL_PROFILER_EXPLAIN', 3))
+REPORT_SLOWEST = 5
+LOCKING_CLAUSE = re.compile(r'\bFOR\s+(UPDATE|NO\s+KEY\s+UPDATE|SHARE|KEY\s+SHARE)\b', re.IGNORECASE)
+
+profile_log = logging.getLogger('sql_profiler')
+
+
+def plan_scans(dialect, plan):
+    """Tables read by a full sequential scan in an EXPLAIN result."""
+    if dialect == 'postgresql':
+        scans = []
+        nodes = [entry['Plan'] for entry in plan]
+        while nodes:
+            node = nodes.pop()
+            if node.get('Node Type') == 'Seq Scan':
+                scans.append(node.get('Relation Name'))
+            nodes.extend(node.get('Plans', ()))
+        return scans
+    # SQLite: 'SCAN booking' is a full scan, 'SCAN booking USING INDEX ...' is not
+    return [detail.split()[-1] for detail in plan if detail.startswith('SCAN') and ' USING ' not in detail]
+
+
+def is_read(statement):
+    return statement.lstrip().upper().startswith('SELECT')
+
+
+def takes_row_locks(statement):
+    """SELECT ... FOR UPDATE / FOR SHARE, e.g. lock_room's, which ANALYZE must not run again."""
+    return bool(LOCKING_CLAUSE.search(statement))
+
+
+def explain(engine, statement, parameters, analyze=True):
+    """Plan a captured statement on the engine that ran it, on its own connection, and roll back.
+
+    analyze runs the statement again (PostgreSQL only) for real timings
+    and buffer counts; without it the plan is only estimated.
+    """
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        try:
+            if dialect == 'postgresql':
+                options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+                plan = conn.exec_driver_sql(f'EXPLAIN ({options}) {statement}', parameters).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+            elif dialect == 'sqlite':
+                plan = [row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+            else:
+                return None, []
+        finally:
+            conn.rollback()
+    return plan, plan_scans(dialect, plan)
+
+
+class ProfileReports:
+    """Per-endpoint totals across every profiled request in this process."""
+
+    def __init__(self):
+        self._reports = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, profile):
+        with self._lock:
+            report = self._reports.setdefault(endpoint, {
+                'requests': 0,
+                'queries': 0,
+                'sql_ms': 0.0,
+                'duplicate_queries': Counter(),
+                'seq_scans': Counter(),
+                'slowest': [],
+            })
+            report['requests'] += 1
+            report['queries'] += len(profile['queries'])
+            report['sql_ms'] += profile['sql_ms']
+            for duplicate in profile['duplicates']:
+                report['duplicate_queries'][duplicate['sql']] += duplicate['count'] - 1
+            for table in profile['seq_scans']:
+                report['seq_scans'][table] += 1
+            report['slowest'] = heapq.nlargest(REPORT_SLOWEST, report['slowest'] + profile['explained'], key=lambda query: query['ms'])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: dict(
+                    report,
+                    sql_ms=round(report['sql_ms'], 2),
+                    avg_queries=round(report['queries'] / report['requests'], 2),
+                    duplicate_queries=dict(report['duplicate_queries'].most_common()),
+                    seq_scans=dict(report['seq_scans'].most_common()),
+                )
+                for endpoint, report in self._reports.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._reports.clear()
+
+
+reports = ProfileReports()
+
+
+def profiling():
+    return has_request_context() and g.get('sql_profile') is not None and not g.sql_profile['explaining']
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_profile_timer(conn, cursor, statement, parameters, context, executemany):
+    if profiling():
+        conn.info.setdefault('profile_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_profile_timer(conn, cursor, statement, parameters, context, executemany):
+    if not profiling() or not conn.info.get('profile_start'):
+        return
+    elapsed = time.perf_counter() - conn.info['profile_start'].pop()
+    g.sql_profile['queries'].append({
+        # A replica's engine when RoutingSession sent the read there
+        'engine': conn.engine,
+        'sql': statement,
+        'parameters': parameters,
+        'executemany': executemany,
+        'ms': elapsed * 1000,
+    })
+
+
+def start_profile():
+    mode = current_app.config['SQL_PROFILER']
+    if mode == 'always' or (mode == 'header' and request.headers.get(PROFILE_HEADER) == '1'):
+        g.sql_profile = {'queries': [], 'explaining': False}
+
+
+def finish_profile(response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+
+    queries = profile['queries']
+    seen = Counter((query['sql'], repr(query['parameters'])) for query in queries)
+    duplicates = [{'sql': sql, 'parameters': parameters, 'count': count} for (sql, parameters), count in seen.items() if count > 1]
+
+    # Only reads are explained, and ANALYZE, which runs the statement again,
+    # only for those that take no row locks
+    candidates = [query for query in queries if not query['executemany'] and is_read(query['sql'])]
+    explained, seq_scans = [], []
+    profile['explaining'] = True
+    g.sql_profile = profile
+    try:
+        for query in heapq.nlargest(EXPLAIN_LIMIT, candidates, key=lambda query: query['ms']):
+            analyze = not takes_row_locks(query['sql'])
+            try:
+                plan, scans = explain(query['engine'], query['sql'], query['parameters'], analyze=analyze)
+            except Exception as e:
+                plan, scans = f'EXPLAIN failed: {e}', []
+            seq_scans.extend(scans)
+            explained.append({'sql': query['sql'], 'ms': round(query['ms'], 2), 'plan': plan, 'seq_scans': scans})
+    finally:
+        g.pop('sql_profile', None)
+
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    result = {
+        'method': request.method,
+        'path': request.full_path,
+        'endpoint': endpoint,
+        'status': response.status_code,
+        'queries': [{'sql': query['sql'], 'ms': round(query['ms'], 2)} for query in queries],
+        'sql_ms': sum(query['ms'] for query in queries),
+        'duplicates': duplicates,
+        'seq_scans': seq_scans,
+        'explained': explained,
+    }
+    reports.add(endpoint, result)
+    profile_log.info(json.dumps(result, default=str))
+
+    response.headers['X-SQL-Query-Count'] = str(len(queries))
+    response.headers['X-SQL-Time-Ms'] = f"{result['sql_ms']:.2f}"
+    if duplicates:
+        response.headers['X-SQL-Duplicate-Queries'] = str(sum(duplicate['count'] - 1 for duplicate in duplicates))
+    if seq_scans:
+        response.headers['X-SQL-Seq-Scans'] = ','.join(sorted(set(seq_scans)))
+    return response
+
+
+def profile_report():
+    if request.method == 'DELETE':
+        reports.clear()
+        return '', 204
+    return jsonify(reports.snapshot())
+
+
+def init_profiler(app):
+    """Capture each request's SQL when profiling is on, for development and load tests only.
+
+    Register it before init_metrics so the EXPLAIN runs after metrics have
+    closed the request and do not count towards its figures. Per-endpoint
+    reports are served on /debug/sql-profile; DELETE resets them.
+    """
+    if app.config.setdefault('SQL_PROFILER', SQL_PROFILER) == 'off':
+        return
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.add_url_rule('/debug/sql-profile', 'sql_profile', profile_report, methods=['GET', 'DELETE'])
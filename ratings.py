@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import Float, case, cast
+
+from models import db, Accommodation_rating
+
+
+def record_rating(accommodation_id, rating, delta):
+    """Add (delta=1) or remove (delta=-1) one rating on the accommodation's aggregate row.
+
+    This runs as a single UPDATE in the caller's transaction, so concurrent
+    reviews cannot lose each other's counts.
+    """
+    table = Accommodation_rating.__table__
+    bucket = table.c[f'rating_{rating}']
+    count = table.c.review_count + delta
+    total = table.c.rating_sum + delta * rating
+
+    result = db.session.execute(
+        table.update()
+        .where(table.c.accommodation_id == accommodation_id)
+        .values({
+            table.c.review_count: count,
+            table.c.rating_sum: total,
+            bucket: bucket + delta,
+            table.c.average_rating: case((count > 0, cast(total, Float) / count), else_=0.0),
+            table.c.updated_at: datetime.utcnow()
+        })
+    )
+
+    # Accommodations get their row on creation; this covers any created before the aggregate existed
+    if result.rowcount == 0 and delta > 0:
+        db.session.add(Accommodation_rating(
+            accommodation_id=accommodation_id,
+            review_count=1,
+            rating_sum=rating,
+            average_rating=float(rating),
+            **{f'rating_{rating}': 1}
+        ))
+
+
+def rating_summary(aggregate):
+    count = aggregate.review_count if aggregate else 0
+    return {
+        'average_rating': round(aggregate.average_rating, 2) if count else None,
+        'review_count': count
+    }
@@ -0,0 +1,224 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+
+# Comma-separated; empty means every query goes to the primary
+REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+MAX_REPLICA_LAG = float(os.getenv('MAX_REPLICA_LAG', 5))
+LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', 5))
+# How long a user who just wrote keeps reading from the primary
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', 10))
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PG_REPLICA_LAG = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+log = logging.getLogger(__name__)
+
+
+def replica_binds(engine_options):
+    """SQLALCHEMY_BINDS entries for each replica, built with engine_options(url, name)."""
+    return {
+        f'replica_{index}': dict(engine_options(url, f'replica_{index}'), url=url)
+        for index, url in enumerate(REPLICA_URLS)
+    }
+
+
+def replication_lag(engine):
+    """Seconds the replica is behind its primary; a SQLite copy never lags."""
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+    with engine.connect() as conn:
+        return float(conn.execute(PG_REPLICA_LAG).scalar() or 0)
+
+
+class ReplicaRouter:
+    """Picks a replica engine for read-only work, skipping any that lag or fail.
+
+    Each replica's lag is measured at most once per LAG_CHECK_SECONDS, by
+    whichever request finds the last reading stale; others keep using the
+    last reading rather than queueing behind the check.
+    """
+
+    def __init__(self, max_lag=MAX_REPLICA_LAG, check_interval=LAG_CHECK_SECONDS, lag=replication_lag):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = lag
+        self._health = {}
+        self._checking = set()
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def healthy(self, name, engine):
+        with self._lock:
+            checked_at, healthy = self._health.get(name, (None, False))
+            stale = checked_at is None or time.monotonic() - checked_at >= self.check_interval
+            if not stale or name in self._checking:
+                return healthy
+            self._checking.add(name)
+        try:
+            lag = self.lag(engine)
+            healthy = lag <= self.max_lag
+            if not healthy:
+                log.warning('Replica %s is %.1fs behind; reading from the primary', name, lag)
+        except Exception:
+            log.exception('Replica %s is unreachable; reading from the primary', name)
+            healthy = False
+        with self._lock:
+            self._health[name] = (time.monotonic(), healthy)
+            self._checking.discard(name)
+        return healthy
+
+    def pick(self, engines):
+        names = sorted(name for name in engines if name and name.startswith('replica_'))
+        if not names:
+            return None
+        start = next(self._turn)
+        for offset in range(len(names)):
+            name = names[(start + offset) % len(names)]
+            if self.healthy(name, engines[name]):
+                return engines[name]
+        return None
+
+    def reset(self):
+        with self._lock:
+            self._health.clear()
+
+
+router = ReplicaRouter()
+
+
+class PrimaryPins:
+    """Users who wrote recently, keyed by JWT identity, whose reads stay on the primary.
+
+    The frontend is on another site and sends Bearer tokens, not cookies,
+    so this is kept on the server. With a shared tier (any client with
+    redis-style get and set(key, value, ex=seconds)) a write on one worker
+    pins the user's reads on every worker; without one, on this worker only.
+    """
+
+    def __init__(self, shared=None):
+        self.shared = shared
+        self._until = {}
+        self._lock = threading.Lock()
+
+    def pin(self, key, seconds=READ_YOUR_WRITES_SECONDS):
+        if self.shared is not None:
+            self.shared.set(f'read_primary:{key}', '1', ex=seconds)
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._until = {other: until for other, until in self._until.items() if until > now}
+            self._until[key] = now + seconds
+
+    def pinned(self, key):
+        if self.shared is not None:
+            return self.shared.get(f'read_primary:{key}') is not None
+        with self._lock:
+            return self._until.get(key, 0) > time.monotonic()
+
+
+pins = PrimaryPins()
+
+
+def identity_key():
+    """The id of the user this request's access token names, or None."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        # A bad token is the view's to reject; here it just means no pin
+        return None
+    if isinstance(identity, dict):
+        identity = identity.get('id')
+    return None if identity is None else str(identity)
+
+
+def reads_may_lag():
+    """Whether this request may read from a replica at all."""
+    if not has_request_context() or request.method not in SAFE_METHODS:
+        return False
+    return not g.get('db_wrote') and not g.get('read_primary')
+
+
+def request_replica(engines):
+    """The replica this request reads from, picked at its first read and kept for the rest.
+
+    Every statement of a request then sees the same snapshot, so an ETag
+    version and its body, or parent rows and their selectin-loaded
+    children, never come from replicas with different lag.
+    """
+    if 'replica' not in g:
+        g.replica = router.pick(engines)
+    return g.replica
+
+
+def primary_reads(view):
+    """Serve every read of this view from the primary.
+
+    For rows a client polls right after creating them, or that background
+    workers keep changing, where even a replica within MAX_REPLICA_LAG
+    would answer 404 or show an old state.
+    """
+    @wraps(view)
+    def read_from_primary(*args, **kwargs):
+        g.read_primary = True
+        return view(*args, **kwargs)
+    return read_from_primary
+
+
+class RoutingSession(Session):
+    """Sends the reads of GET requests to a replica and everything else to the primary.
+
+    A session that has flushed or run a DML statement stays on the primary
+    for the rest of the request, and the user's reads stay there for
+    READ_YOUR_WRITES_SECONDS so they see their own writes. Work outside a
+    request (CLI commands, worker threads) uses the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                if has_request_context():
+                    g.db_wrote = True
+            elif reads_may_lag():
+                engine = request_replica(self._db.engines)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def check_pinned():
+    g.db_identity = identity_key()
+    g.read_primary = g.db_identity is not None and request.method in SAFE_METHODS and pins.pinned(g.db_identity)
+
+
+def keep_reads_on_primary(response):
+    if g.get('db_wrote') and g.get('db_identity') is not None:
+        pins.pin(g.db_identity)
+    return response
+
+
+def forget_request(error=None):
+    # Flask reuses g when a test or CLI already has an app context pushed
+    for name in ('db_wrote', 'db_identity', 'read_primary', 'replica'):
+        g.pop(name, None)
+
+
+def init_replicas(app):
+    """Route reads per request; uses the shared cache tier for pins when init_cache set one up."""
+    pins.shared = app.extensions.get('shared_cache')
+    app.before_request(check_pinned)
+    app.after_request(keep_reads_on_primary)
+    app.teardown_request(forget_request)
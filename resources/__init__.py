@@ -0,0 +1,10 @@
+from flask_restful import Api
+
+from metrics import timed_output_json
+
+
+def make_api(blueprint):
+    """A flask-restful Api on blueprint whose JSON output counts towards serialisation metrics."""
+    api = Api(blueprint)
+    api.representation('application/json')(timed_output_json)
+    return api
@@ -0,0 +1,177 @@
+from flask import Blueprint, current_app, request
+from flask_restful import Resource
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from models import db, User, Accommodations
+from pagination import paginate
+from passwords import HasherBusy, busy_response, hasher, is_strong_password
+from email_validation import EmailValidator, is_valid_email
+from resources import make_api
+
+
+def email_validator():
+    """The app's EmailValidator, built the first time an address is checked."""
+    validator = current_app.extensions.get('email_validator')
+    if validator is None:
+        validator = current_app.extensions.setdefault('email_validator', EmailValidator(
+            current_app.config['EMAIL_VALIDATION_API_URL'],
+            current_app.config['EMAIL_VALIDATION_API_KEY']
+        ))
+    return validator
+
+def is_real_email(email):
+    return email_validator().is_real(email)
+
+
+class Signup(Resource):
+    def post(self):
+        data = request.get_json()
+        name = data.get('name')
+        email = data.get('email')
+        password = data.get('password')
+        confirm_password = data.get('confirm_password')  # Get confirm password
+        role = data.get('role', 'user')
+
+        if not is_valid_email(email):
+            return {'error': 'Invalid email format, please provide a valid email address.'}, 400
+
+        if User.query.filter_by(email=email).first():
+            return {'error': 'Email already exists!'}, 400
+
+        if not is_strong_password(password):
+            return {'error': 'Password must be at least 8 characters long and contain both letters and numbers.'}, 400
+
+        # ✅ Check if password matches confirm_password
+        if password != confirm_password:
+            return {'error': 'Passwords do not match!'}, 400
+
+        # Hash and store only the password
+        try:
+            hash = hasher.hash(password)
+        except HasherBusy:
+            return busy_response()
+        new_user = User(name=name, email=email, password=hash, role=role)
+        db.session.add(new_user)
+        db.session.commit()
+
+        create_token = create_access_token(identity={'id': new_user.id, 'name': new_user.name, 'email': new_user.email, 'role': new_user.role})
+
+        return {
+            'message': 'User created successfully!',
+            'create_token': create_token,
+            'user': {
+                'id': new_user.id,
+                'name': new_user.name,
+                'email': new_user.email,
+                'role': new_user.role
+            }
+        }, 201
+
+    
+class Login(Resource):
+    def post(self):
+        data = request.get_json()
+        name = data.get('name')
+        email = data.get('email')
+        password = data.get('password')
+        role = data.get('role', 'user')
+
+        user = User.query.filter_by(name=name, email=email).first()
+
+        try:
+            valid = hasher.check_user(user, password)
+        except HasherBusy:
+            return busy_response()
+        
+        if valid:
+            db.session.commit()
+            create_token = create_access_token(identity={'id':user.id, 'name':user.name, 'email':user.email, 'role':user.role})
+            refresh_token = create_refresh_token(identity={'id':user.id, 'name':user.name, 'email':user.email, 'role':user.role})
+            return {
+                'create_token': create_token,
+                'refresh_token': refresh_token,
+                'role': user.role,
+                'user': {
+                    'id': user.id,
+                    'name': user.name,
+                    'email': user.email,
+                    'role': user.role
+                }
+            }
+
+        return {'error' : 'Incorrect name, email or password, please try again!'}, 401
+
+class DeleteAcc(Resource):
+    @jwt_required()
+    def delete(self):
+        current = get_jwt_identity()
+        user_id = current.get('id')
+        role = current.get('role')
+
+        data = request.get_json()
+        target_user_id = data.get('user_id') if data else user_id
+
+        if role != "admin" and target_user_id != user_id:
+            return {'error': 'Unauthorized action!'}, 403
+
+        delete_user = User.query.get(target_user_id)
+        if not delete_user:
+            return {'error': 'The user does not exist!'}, 404
+
+        db.session.delete(delete_user)
+        db.session.commit()
+        return {'message': 'The user was deleted successfully!'}, 200
+
+    
+class Refresh(Resource):
+    @jwt_required(refresh = True)
+    def post(self):
+        current_user = get_jwt_identity()
+        new_access_token = create_refresh_token(identity = current_user)
+        return{'access_token':new_access_token}, 201
+    
+class Accommodate(Resource):
+    @jwt_required()
+    def get(self):
+        accommodations = Accommodations.query.all()
+        return[{'id':acom.id, 'name':acom.name,'user_id':acom.user_id, 'price':acom.price, 'image':acom.image,'description':acom.description, 'availability':acom.availability} for acom in accommodations]
+
+class ValidateEmails(Resource):
+    @jwt_required()
+    def post(self):
+        current_user = get_jwt_identity()
+        if current_user['role'] != 'admin':
+            return {'error': 'Access forbidden!'}, 403
+
+        data = request.get_json()
+        emails = data.get('emails') if data else None
+        if not isinstance(emails, list) or not all(isinstance(email, str) for email in emails):
+            return {'error': 'emails must be a list of addresses!'}, 422
+        if len(emails) > 1000:
+            return {'error': 'At most 1000 addresses can be validated at once!'}, 413
+
+        results = email_validator().validate_many(email for email in emails if is_valid_email(email))
+        return {'results': {email: results.get(email, False) for email in emails}}, 200
+
+class Use(Resource):
+    @jwt_required()
+    def get(self):
+        current_user = get_jwt_identity()
+
+        if current_user['role'] != 'admin':
+            return {'error': 'Access forbidden!'}, 403
+
+        users = paginate(User.query, User, lambda user: {'id': user.id, 'name': user.name, 'email': user.email, 'role': user.role})
+
+        return users, 200
+
+
+auth_bp = Blueprint('auth', __name__)
+api = make_api(auth_bp)
+
+api.add_resource(Signup, '/signup')
+api.add_resource(Login, '/login')
+api.add_resource(Refresh, '/refresh')
+api.add_resource(DeleteAcc, '/delete')
+api.add_resource(Accommodate, '/accommodate')
+api.add_resource(Use, '/users')
+api.add_resource(ValidateEmails, '/admin/validate-emails')
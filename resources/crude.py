@@ -1,13 +1,53 @@
-from flask import Flask, request, jsonify
-from flask_restful import Resource, Api
-from models import User, Accommodations, Booking, db, Rooms, Reviews
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_restful import Resource
+from models import User, Accommodations, Accommodation_rating, Booking, db, Rooms, Reviews
+from pagination import paginate
+from serializers import accommodation_dict, room_dict, review_dict, public_review_dict
+from availability import active_bookings, find_conflicting_booking, lock_room, run_with_retry
+from cache import catalog_cache
+from conditional import conditional_get, table_version
+from geo import bounding_box, haversine_km
+from search import search_index
+from ratings import rating_summary, record_rating
+from passwords import HasherBusy, busy_response, hasher
+from bulk import BOOKING_EXPORT_COLUMNS, FORMATS, KINDS, ROOM_NO_RANGE, ROOM_PRICE_RANGE, Importer, booking_export_query, export_rows, stream_rows
+from resources import make_api
+
+import heapq
 from datetime import datetime, timedelta
-from werkzeug.security import check_password_hash
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import jwt_required, get_jwt_identity
-
-app = Flask(__name__)
-bcrypt = Bcrypt(app)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+
+# Eager-load everything to_dict() walks so a listing costs a fixed number of queries
+USER_DICT_OPTIONS = (selectinload(User.user_verification), selectinload(User.password_reset), selectinload(User.reviews))
+ROOM_DICT_OPTIONS = (joinedload(Rooms.accommodations),)
+REVIEW_DICT_OPTIONS = (
+    joinedload(Reviews.user).selectinload(User.user_verification),
+    joinedload(Reviews.user).selectinload(User.password_reset),
+)
+BOOKING_DICT_OPTIONS = (
+    joinedload(Booking.user).options(*USER_DICT_OPTIONS),
+    joinedload(Booking.accommodations),
+    joinedload(Booking.room).joinedload(Rooms.accommodations),
+)
+
+def invalidate_rooms(*accommodation_ids):
+    catalog_cache.invalidate('rooms:all', *(f'rooms:{accommodation_id}' for accommodation_id in accommodation_ids))
+
+def invalidate_accommodation(id):
+    catalog_cache.invalidate('accommodations', f'accommodation:{id}')
+    invalidate_rooms(id)
+
+def cached_conditional_get(tags, version, loader, last_modified=None):
+    # version is part of the key, so a worker whose cache missed another worker's
+    # invalidation still never pairs a new ETag with an old body
+    return conditional_get(
+        version,
+        lambda: catalog_cache.get_or_load(tags, f'{request.full_path}|{version}', loader),
+        last_modified=last_modified
+    )
 
 class Users(Resource):
     def get(self, id):
@@ -41,9 +81,12 @@ class Users(Resource):
             current_password = data.get('current_password')
             if not current_password:
                 return {'error': 'Current password is required to change password'}, 400
-            if not check_password_hash(user.password, current_password):
-                return {'error': 'Incorrect current password'}, 401
-            user.password = bcrypt.generate_password_hash(new_password).decode('utf-8')
+            try:
+                if not hasher.verify(user.password, current_password):
+                    return {'error': 'Incorrect current password'}, 401
+                user.password = hasher.hash(new_password)
+            except HasherBusy:
+                return busy_response()
 
         db.session.commit()
         return {'message': 'Profile updated successfully'}, 200
@@ -65,10 +108,24 @@ class Users(Resource):
 
 class AccommodationList(Resource):
     def get(self):
-        accommodations = Accommodations.query.all()
-        if not accommodations:
+        return cached_conditional_get(('accommodations',), table_version(Accommodations, Accommodation_rating), self.load)
+
+    def load(self):
+        query = Accommodations.query.outerjoin(Accommodations.rating).options(contains_eager(Accommodations.rating))
+        serialize = lambda accommo: dict(accommodation_dict(accommo), **rating_summary(accommo.rating))
+
+        if request.args.get('sort') == 'rating':
+            accommodations = paginate(
+                query, Accommodations, serialize,
+                sort_column=func.coalesce(Accommodation_rating.average_rating, 0.0),
+                sort_value=lambda accommo: accommo.rating.average_rating if accommo.rating else 0.0
+            )
+        else:
+            accommodations = paginate(query, Accommodations, serialize)
+
+        if not accommodations['items']:
             return {"error": "Accommodation not found"}, 404
-        return [accommo.to_dict() for accommo in accommodations]
+        return accommodations, 200
     
     @jwt_required()
     def post(self):
@@ -89,12 +146,64 @@ class AccommodationList(Resource):
             longitude=data['longitude']
         )
         db.session.add(new_accommodation)
+        db.session.flush()
+        db.session.add(Accommodation_rating(accommodation_id=new_accommodation.id))
+        search_index.index_accommodation(new_accommodation)
         db.session.commit()
+        invalidate_accommodation(new_accommodation.id)
         return new_accommodation.to_dict(), 201
 
 
+class NearbyAccommodations(Resource):
+    def get(self):
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        if lat is None or lng is None or not -90 <= lat <= 90 or not -180 <= lng <= 180:
+            return {'error': 'lat and lng must be valid coordinates!'}, 400
+
+        radius = request.args.get('radius', 5, type=float)
+        if radius <= 0:
+            return {'error': 'radius must be a positive number of kilometres!'}, 400
+        radius = min(radius, 50)
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+
+        return catalog_cache.get_or_load(('accommodations',), request.full_path, lambda: self.load(lat, lng, radius, limit))
+
+    def load(self, lat, lng, radius, limit):
+        # The bounding box uses the (latitude, longitude) index; haversine then trims it to the circle
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+        query = db.session.query(Accommodations.id, Accommodations.latitude, Accommodations.longitude).filter(
+            Accommodations.latitude.between(min_lat, max_lat)
+        )
+        if min_lng is not None:
+            query = query.filter(Accommodations.longitude.between(min_lng, max_lng))
+
+        candidates = []
+        for id, latitude, longitude in query:
+            distance = haversine_km(lat, lng, latitude, longitude)
+            if distance <= radius:
+                candidates.append((distance, id))
+        nearest = heapq.nsmallest(limit, candidates)
+
+        accommodations = {
+            accommodation.id: accommodation
+            for accommodation in Accommodations.query.filter(Accommodations.id.in_([id for _, id in nearest]))
+        } if nearest else {}
+
+        return [
+            dict(accommodation_dict(accommodations[id]), distance_km=round(distance, 3))
+            for distance, id in nearest
+        ], 200
+
+
 class Accommodation(Resource):
     def get(self, id):
+        updated_at = db.session.query(Accommodations.updated_at).filter_by(id=id).scalar()
+        if updated_at is None:
+            return self.load(id)
+        return cached_conditional_get((f'accommodation:{id}',), updated_at.isoformat(), lambda: self.load(id), last_modified=updated_at)
+
+    def load(self, id):
         accommodation = Accommodations.query.get(id)
         if not accommodation:
             return {"message": "Accommodation not found"}, 404
@@ -105,7 +214,7 @@ class Accommodation(Resource):
             "description": accommodation.description,
             "latitude": accommodation.latitude,
             "longitude": accommodation.longitude
-        }
+        }, 200
 
     @jwt_required()
     def patch(self, id):
@@ -130,7 +239,9 @@ class Accommodation(Resource):
         if 'longitude' in data:
             accommodation.longitude = data['longitude']
 
+        search_index.index_accommodation(accommodation)
         db.session.commit()
+        invalidate_accommodation(id)
         return accommodation.to_dict(), 200
     
     def put(self, id):
@@ -150,7 +261,9 @@ class Accommodation(Resource):
         if 'longitude' in data:
             accommodation.longitude = data['longitude']
 
+        search_index.index_accommodation(accommodation)
         db.session.commit()
+        invalidate_accommodation(id)
         return accommodation.to_dict(), 200
 
     @jwt_required()
@@ -162,25 +275,37 @@ class Accommodation(Resource):
         accommodation = Accommodations.query.get(id)
         if not accommodation:
             return {'message': 'Accommodation not found!'}, 404
+        room_ids = [room.id for room in accommodation.rooms]
+        # Done here rather than left to ON DELETE, which SQLite ignores without PRAGMA foreign_keys
+        Accommodation_rating.query.filter_by(accommodation_id=id).delete(synchronize_session=False)
+        Reviews.query.filter_by(accommodation_id=id).update({'accommodation_id': None}, synchronize_session=False)
         db.session.delete(accommodation)
+        search_index.remove('accommodation', id)
+        for room_id in room_ids:
+            search_index.remove('room', room_id)
         db.session.commit()
+        invalidate_accommodation(id)
         return {'message': 'Accommodation and its associated rooms have been deleted successfully!'}, 200
 
     
 # Rooms
 class Room(Resource):
     def get(self):
-        accommodation_id = request.args.get('accommodation_id')  
+        accommodation_id = request.args.get('accommodation_id', type=int)
+        tag = f'rooms:{accommodation_id}' if accommodation_id else 'rooms:all'
+        # Room payloads embed their accommodation, so both tables feed the ETag
+        return cached_conditional_get((tag,), table_version(Rooms, Accommodations), lambda: self.load(accommodation_id))
 
+    def load(self, accommodation_id):
+        query = Rooms.query
         if accommodation_id:
-            rooms = Rooms.query.filter_by(accommodation_id=accommodation_id).all()
-        else:
-            rooms = Rooms.query.all() 
+            query = query.filter_by(accommodation_id=accommodation_id)
 
-        if not rooms:
+        rooms = paginate(query.options(*ROOM_DICT_OPTIONS), Rooms, room_dict)
+        if not rooms['items']:
             return {"error": "Rooms not found"}, 404
 
-        return [room.to_dict() for room in rooms], 200 
+        return rooms, 200 
     
     @jwt_required()
     def post(self):
@@ -193,14 +318,12 @@ class Room(Resource):
             return {'error': 'Missing required fields!'}, 422
         
         room_no = data['room_no']
-        min = 1
-        max = 100
+        min, max = ROOM_NO_RANGE
         if room_no < min or room_no > max:
             return {'error' : f'Hostel rooms must be between {min} and {max} respectively!'},400
         
         price = data['price']
-        min = 5000
-        max = 30000
+        min, max = ROOM_PRICE_RANGE
         if price < min or price > max:
             return {'error' : f'Room price must be between {min} and {max} price!'},400
 
@@ -223,7 +346,10 @@ class Room(Resource):
             description = data['description']
         )
         db.session.add(new_room)
+        db.session.flush()
+        search_index.index_room(new_room)
         db.session.commit()
+        invalidate_rooms(new_room.accommodation_id)
         return new_room.to_dict(), 201
 
 
@@ -253,11 +379,11 @@ class RoomList(Resource):
         
         if not room:
             return {'message': 'Room not found'}, 404
+        old_accommodation_id = room.accommodation_id
 
         if 'room_no' in data:
             new_room_no = data['room_no']
-            min = 1
-            max = 100
+            min, max = ROOM_NO_RANGE
             if new_room_no < min or new_room_no > max:
                 return {'error': f'Hostel rooms must be between {min} and {max} respectively!'}, 400
             
@@ -270,8 +396,7 @@ class RoomList(Resource):
 
         if 'price' in data:
             new_price = data['price']
-            min = 5000
-            max = 30000
+            min, max = ROOM_PRICE_RANGE
             if new_price < min or new_price > max:
                 return {'error': f'Room price must be between {min} and {max} price!'}, 400
             room.price = new_price
@@ -294,7 +419,9 @@ class RoomList(Resource):
         if 'description' in data:
             room.description = data['description']
 
+        search_index.index_room(room)
         db.session.commit()
+        invalidate_rooms(old_accommodation_id, room.accommodation_id)
         return room.to_dict(), 200
     
     @jwt_required()
@@ -307,26 +434,71 @@ class RoomList(Resource):
         if not accommodation:
             return {'message': 'room not found!'}, 404
         db.session.delete(accommodation)
+        search_index.remove('room', id)
         db.session.commit()
+        invalidate_rooms(accommodation.accommodation_id)
         return {'message': 'room deleted successfully!'}
     
 class RoomListResource(Resource):
     def get(self):
         accommodation_id = request.args.get('accommodation_id')
-        query = db.session.query(Rooms)
+        query = db.session.query(Rooms).options(*ROOM_DICT_OPTIONS)
 
         if accommodation_id:
             query = query.filter(Rooms.accommodation_id == int(accommodation_id))  
 
-        rooms = [room.to_dict() for room in query.all()]
+        rooms = paginate(query, Rooms, lambda room: room.to_dict())
         return rooms, 200  
+
+def parse_search_date(value):
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+class AvailableRooms(Resource):
+    def get(self):
+        start_date = parse_search_date(request.args.get('start_date'))
+        end_date = parse_search_date(request.args.get('end_date'))
+        if not start_date or not end_date:
+            return {'error': 'start_date and end_date are required. Use YYYY-MM-DD or YYYY-MM-DD HH:MM'}, 400
+        if end_date <= start_date:
+            return {'error': 'end_date must be after start_date!'}, 400
+
+        accommodation_id = request.args.get('accommodation_id', type=int)
+        room_type = request.args.get('room_type')
+        min_price = request.args.get('min_price', type=int)
+        max_price = request.args.get('max_price', type=int)
+
+        query = Rooms.query.options(*ROOM_DICT_OPTIONS)
+        if accommodation_id:
+            query = query.filter(Rooms.accommodation_id == accommodation_id)
+        if min_price is not None:
+            query = query.filter(Rooms.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Rooms.price <= max_price)
+        if room_type:
+            query = query.filter(Rooms.room_type == room_type)
+
+        # Anti-join: keep rooms with no active booking overlapping the requested dates
+        overlapping = db.session.query(Booking.id).filter(
+            Booking.room_id == Rooms.id,
+            Booking.end_date > start_date,
+            Booking.start_date < end_date,
+            active_bookings()
+        )
+        query = query.filter(~overlapping.exists())
+
+        return paginate(query, Rooms, room_dict), 200
     
 class Review(Resource):
     def get (self):
-        reviews = Reviews.query.all()
-        if not reviews:
+        reviews = paginate(Reviews.query.options(*REVIEW_DICT_OPTIONS), Reviews, review_dict)
+        if not reviews['items']:
             return {"error": "reviews not found"}, 404
-        return [accommo.to_dict() for accommo in reviews]
+        return reviews
     
     @jwt_required()
     def post(self):
@@ -347,14 +519,25 @@ class Review(Resource):
         except ValueError:
             return {"error": "Rating must be a valid number!"}, 400
 
+        accommodation_id = data.get("accommodation_id")
+        if accommodation_id is not None and not Accommodations.query.get(accommodation_id):
+            return {"error": "The accommodation does not exist!"}, 404
+
         new_review = Reviews(
             user_id=current_user["id"],  
             rating=rating,
             content=data["content"],
+            accommodation_id=accommodation_id,
         )
 
         db.session.add(new_review)
+        db.session.flush()
+        search_index.index_review(new_review)
+        if accommodation_id is not None:
+            record_rating(accommodation_id, rating, 1)
         db.session.commit()
+        if accommodation_id is not None:
+            catalog_cache.invalidate('accommodations')
 
         return new_review.to_dict(), 201
 
@@ -362,7 +545,7 @@ class MyReview(Resource):
     @jwt_required()
     def get(self):
         current_user = get_jwt_identity()
-        user_reviews = Reviews.query.filter_by(user_id=current_user['id']).all()
+        user_reviews = Reviews.query.options(*REVIEW_DICT_OPTIONS).filter_by(user_id=current_user['id']).all()
 
         if not user_reviews:
             return {"message": "You have no reviews yet."}, 404
@@ -388,16 +571,53 @@ class ReviewList(Resource):
 
         reviews = Reviews.query.get(id)
 
-        if current_user['role'] != 'admin' and reviews.user_id != current_user['id']:
-            return {'error': 'You are not authorized to delete this review!'}, 403
-        
         if not reviews:
             return {'message': 'reviews not found!'}, 404
+
+        if current_user['role'] != 'admin' and reviews.user_id != current_user['id']:
+            return {'error': 'You are not authorized to delete this review!'}, 403
         
         db.session.delete(reviews)
+        search_index.remove('review', id)
+        if reviews.accommodation_id is not None:
+            record_rating(reviews.accommodation_id, reviews.rating, -1)
         db.session.commit()
+        if reviews.accommodation_id is not None:
+            catalog_cache.invalidate('accommodations')
         return {'message': 'reviews deleted successfully!'}
 
+class Search(Resource):
+    def get(self):
+        q = request.args.get('q', '').strip()
+        if not q:
+            return {'error': 'A search query is required!'}, 400
+
+        kind = request.args.get('type')
+        if kind and kind not in ('accommodation', 'room', 'review'):
+            return {'error': 'type must be accommodation, room or review!'}, 400
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+
+        hits = search_index.search(q, kind=kind, limit=limit)
+
+        # One query per result type, then put the rows back in rank order
+        loaders = {
+            'accommodation': (Accommodations.query, Accommodations, accommodation_dict),
+            'room': (Rooms.query.options(*ROOM_DICT_OPTIONS), Rooms, room_dict),
+            'review': (Reviews.query.options(joinedload(Reviews.user)), Reviews, public_review_dict),
+        }
+        rows = {}
+        for hit_kind, (query, model, serialize) in loaders.items():
+            ids = [ref for k, ref, _ in hits if k == hit_kind]
+            if ids:
+                rows.update({(hit_kind, row.id): serialize(row) for row in query.filter(model.id.in_(ids))})
+
+        return {
+            'items': [
+                {'type': k, 'id': ref, 'score': score, 'data': rows[(k, ref)]}
+                for k, ref, score in hits if (k, ref) in rows
+            ]
+        }, 200
+
 #Bookings
 class BookingsList(Resource):
     @jwt_required()
@@ -406,11 +626,11 @@ class BookingsList(Resource):
         if current['role'] != 'admin':
             return {'error': 'The user is not authorized!'}, 403
         
-        bookings = Booking.query.all()
-        if not bookings:
+        bookings = paginate(Booking.query.options(*BOOKING_DICT_OPTIONS), Booking, lambda booking: booking.to_dict())
+        if not bookings['items']:
             return {"error": "No bookings found!"}, 404
 
-        return [booking.to_dict() for booking in bookings]
+        return bookings
     
     @jwt_required()
     def post(self):
@@ -437,35 +657,65 @@ class BookingsList(Resource):
         accommodation_id=data['accommodation_id']
         room_id=data['room_id']
 
-        room = Rooms.query.get(room_id)
-        if not room :
-            return {"error": "The room does not exist!"}, 404
-        if room.accommodation_id != accommodation_id:
-            return {"error": "The room does not belong to the accommodation!"}, 404
+        def reserve():
+            # Lock the room so concurrent workers booking the same room queue up here
+            room = lock_room(room_id)
+            if not room :
+                return {"error": "The room does not exist!"}, 404
+            if room.accommodation_id != accommodation_id:
+                return {"error": "The room does not belong to the accommodation!"}, 404
 
-        existing_booking = Booking.query.filter(
-            Booking.room_id == room.id, 
-            Booking.end_date > start_date,
-            Booking.start_date < end_date
-        ).first()
+            existing_booking = find_conflicting_booking(room.id, start_date, end_date)
 
-        if existing_booking:
-            return {"error" : "Room is already booked for selected dates!"},400
-        
-        booking = Booking(
-            user_id = user_id,
-            accommodation_id = accommodation_id,
-            room_id = room.id,
-            start_date = start_date,
-            end_date = end_date,
-            status="confirmed"
-        )
+            if existing_booking:
+                return {"error" : "Room is already booked for selected dates!"},400
+            
+            booking = Booking(
+                user_id = user_id,
+                accommodation_id = accommodation_id,
+                room_id = room.id,
+                start_date = start_date,
+                end_date = end_date,
+                status="confirmed"
+            )
+
+            db.session.add(booking)
+            room.availability = False  
+            db.session.commit()
+            invalidate_rooms(room.accommodation_id)
+            return booking.to_dict(),201
 
-        db.session.add(booking)
-        room.availability = False  
-        db.session.commit()
-        return booking.to_dict(),201
+        try:
+            return run_with_retry(reserve)
+        except OperationalError:
+            return {'error': 'The room is being booked by someone else, please try again!'}, 503
     
+class BookingsExport(Resource):
+    @jwt_required()
+    def get(self):
+        current = get_jwt_identity()
+        if current['role'] != 'admin':
+            return {'error': 'The user is not authorized!'}, 403
+
+        format = request.args.get('format', 'ndjson')
+        if format not in FORMATS:
+            return {'error': 'format must be csv or ndjson!'}, 400
+
+        start, end = (request.args.get(name) for name in ('start_date', 'end_date'))
+        start_date, end_date = parse_search_date(start), parse_search_date(end)
+        if (start and not start_date) or (end and not end_date):
+            return {'error': 'Invalid date format. Use YYYY-MM-DD or YYYY-MM-DD HH:MM'}, 400
+        if start_date and end_date and end_date <= start_date:
+            return {'error': 'end_date must be after start_date!'}, 400
+
+        query = booking_export_query(start_date, end_date, request.args.get('status'))
+        mimetype = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+        return Response(
+            stream_with_context(stream_rows(query, BOOKING_EXPORT_COLUMNS, format)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=bookings.{format}'}
+        )
+
 class CancelBooking(Resource):
     @jwt_required()
     def patch(self, id):
@@ -487,6 +737,8 @@ class CancelBooking(Resource):
             booking.room.availability = True
 
         db.session.commit()
+        if booking.room:
+            invalidate_rooms(booking.room.accommodation_id)
 
         return {
             'message': 'Booking canceled successfully!',
@@ -508,15 +760,11 @@ class Bookings(Resource):
             return {'error': 'User not found!'}, 403
 
         # Fetch bookings based on user role
-        if user_role == 'admin':
-            bookings = Booking.query.all()
-        else:
-            bookings = Booking.query.filter_by(user_id=user_id).all()
-
-        if not bookings:
-            return {'message': 'No bookings found!'}, 404
+        query = Booking.query.options(joinedload(Booking.user), joinedload(Booking.room))
+        if user_role != 'admin':
+            query = query.filter_by(user_id=user_id)
 
-        return [{
+        bookings = paginate(query, Booking, lambda book: {
             'id': book.id,
             'user_id': book.user_id,
             'user_name': book.user.name if book.user else "N/A",  
@@ -532,7 +780,12 @@ class Bookings(Resource):
             'room_description': book.room.description if book.room else "N/A",
             'room_price': book.room.price if book.room else "N/A",
             'accommodation_id': book.room.accommodation_id if book.room else "N/A"
-        } for book in bookings], 200
+        })
+
+        if not bookings['items']:
+            return {'message': 'No bookings found!'}, 404
+
+        return bookings, 200
 
 
 
@@ -550,8 +803,8 @@ class Bookings(Resource):
 class RoomBookings(Resource):
     @jwt_required()
     def get(self, room_id):
-        # Fetch bookings for the specific room
-        bookings = Booking.query.filter_by(room_id=room_id).all()
+        # Fetch the bookings that still hold the room; canceled dates are free again
+        bookings = Booking.query.filter(Booking.room_id == room_id, active_bookings()).all()
         if not bookings:
             return {"booked_dates": []}, 200
 
@@ -562,3 +815,99 @@ class RoomBookings(Resource):
         ]
 
         return {"booked_dates": booked_dates}, 200
+
+
+def bulk_format():
+    format = request.args.get('format')
+    if format:
+        return format
+    return 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+
+class AdminImport(Resource):
+    @jwt_required()
+    def post(self):
+        current_user = get_jwt_identity()
+        if current_user['role'] != 'admin':
+            return {'error': 'The user is forbidden from importing data!'}, 403
+
+        kind = request.args.get('type')
+        format = bulk_format()
+        if kind not in KINDS:
+            return {'error': 'type must be accommodations, rooms or users!'}, 400
+        if format not in FORMATS:
+            return {'error': 'format must be csv or ndjson!'}, 400
+
+        # Read straight off the socket, or from the part of a multipart upload
+        stream = request.files['file'].stream if request.mimetype == 'multipart/form-data' and 'file' in request.files else request.stream
+
+        importer = Importer(kind, format)
+        try:
+            report = importer.run(stream)
+        except HasherBusy:
+            db.session.rollback()
+            return busy_response()
+        except UnicodeDecodeError:
+            db.session.rollback()
+            report = dict(importer.report(), error='The file must be UTF-8 encoded!')
+            return report, 400
+
+        if importer.inserted:
+            if kind == 'accommodations':
+                catalog_cache.invalidate('accommodations')
+            elif kind == 'rooms':
+                invalidate_rooms(*importer.accommodation_ids)
+        return report, 200
+
+class AdminExport(Resource):
+    @jwt_required()
+    def get(self):
+        current_user = get_jwt_identity()
+        if current_user['role'] != 'admin':
+            return {'error': 'The user is forbidden from exporting data!'}, 403
+
+        kind = request.args.get('type')
+        format = request.args.get('format', 'ndjson')
+        if kind not in KINDS:
+            return {'error': 'type must be accommodations, rooms or users!'}, 400
+        if format not in FORMATS:
+            return {'error': 'format must be csv or ndjson!'}, 400
+
+        mimetype = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+        return Response(
+            stream_with_context(export_rows(kind, format)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={kind}.{format}'}
+        )
+
+
+catalog_bp = Blueprint('catalog', __name__)
+api = make_api(catalog_bp)
+
+api.add_resource(AccommodationList, '/accommodations')
+api.add_resource(Accommodation, '/accommodations/<int:id>')
+api.add_resource(NearbyAccommodations, '/accommodations/nearby')
+
+api.add_resource(Room, '/rooms')
+api.add_resource(RoomList, '/rooms/<int:id>')
+api.add_resource(RoomListResource, '/rooms')
+api.add_resource(AvailableRooms, '/rooms/available')
+
+api.add_resource(Users, '/users/<int:id>')
+
+api.add_resource(Review, '/reviews')
+api.add_resource(ReviewList, '/reviews/<int:id>')
+api.add_resource(MyReview, '/my-reviews')
+
+api.add_resource(Search, '/search')
+
+api.add_resource(BookingsList, '/bookings', '/bookings/<int:id>' )
+api.add_resource(Bookings, '/Userbookings')
+api.add_resource(CancelBooking, "/bookings/<int:id>/cancel")
+api.add_resource(BookingsExport, '/bookings/export')
+
+# api.add_resource(RoomBookings, "/bookings/room/<int:room_no>")
+
+api.add_resource(RoomBookings, "/rooms/<int:room_id>/booked-dates")
+
+api.add_resource(AdminImport, '/admin/import')
+api.add_resource(AdminExport, '/admin/export')
@@ -0,0 +1,104 @@
+import os
+import threading
+
+from flask import Blueprint, current_app, jsonify, request
+from models import Payment_job
+from replicas import primary_reads
+
+payments_bp = Blueprint('payments', __name__)
+
+_lock = threading.Lock()
+
+
+class MpesaIntegration:
+    """The Daraja client, STK push queue (with its sweeper) and callback writer for one worker process.
+
+    Built on the first payment request rather than at import, so workers
+    that never take a payment skip loading it and threads are only started
+    after gunicorn has forked.
+    """
+
+    def __init__(self, app):
+        from mpesa import MpesaGateway, TokenManager
+        from payment_callbacks import CallbackWriter, callback_log
+        from payment_jobs import PaymentQueue
+        from sessions import make_session
+
+        config = app.config
+        session = make_session()
+        tokens = TokenManager(session, config['MPESA_TOKEN_URL'], config['MPESA_CONSUMER_KEY'], config['MPESA_CONSUMER_SECRET'])
+        gateway = MpesaGateway(
+            session,
+            tokens,
+            config['MPESA_STK_PUSH_URL'],
+            config['MPESA_SHORTCODE'],
+            config['MPESA_PASSKEY'],
+            config['MPESA_CALLBACK_URL']
+        )
+        self.pid = os.getpid()
+        self.queue = PaymentQueue(
+            app,
+            gateway,
+            workers=config['MPESA_WORKERS'],
+            stale_after=config['MPESA_JOB_STALE_SECONDS'],
+            sweep_every=config['MPESA_SWEEP_SECONDS']
+        )
+        self.callback_writer = CallbackWriter(
+            app,
+            batch_size=config['MPESA_CALLBACK_BATCH'],
+            flush_interval=config['MPESA_CALLBACK_FLUSH']
+        )
+        self.callback_log = callback_log(config['MPESA_CALLBACK_LOG'])
+
+
+def mpesa():
+    integration = current_app.extensions.get('mpesa')
+    if integration is None or integration.pid != os.getpid():
+        with _lock:
+            integration = current_app.extensions.get('mpesa')
+            if integration is None or integration.pid != os.getpid():
+                integration = current_app.extensions['mpesa'] = MpesaIntegration(current_app._get_current_object())
+    return integration
+
+
+@payments_bp.route('/mpesa/pay', methods = ['POST'])
+def mpesa_pay():
+    phone_number = request.json.get('phone_number')
+    amount = request.json.get('amount')
+    booking_id = request.json.get('booking_id')
+
+    if not phone_number or not amount:
+        return jsonify({'error' : 'Missing required fields!'}), 422
+
+    job_id, _ = mpesa().queue.enqueue(phone_number, amount, booking_id)
+    return jsonify({'message' : 'STK push queued', 'job_id' : job_id}), 202
+
+@payments_bp.route('/mpesa/pay/<job_id>', methods = ['GET'])
+# POST /mpesa/pay needs no token, so there is no identity to pin, and the
+# STK queue and callbacks update the job on the primary as the client polls
+@primary_reads
+def mpesa_pay_status(job_id):
+    from payment_jobs import job_status
+
+    # Starts this worker's sweeper, which settles jobs a restarted worker left pending
+    mpesa()
+    job = Payment_job.query.get(job_id)
+    if not job:
+        return jsonify({'error' : 'Payment job not found!'}), 404
+    return jsonify(job_status(job)), 200
+
+@payments_bp.route('/mpesa/callback', methods = ['POST'])
+def mpesa_callback():
+    from payment_callbacks import log_callback, parse_callback
+
+    integration = mpesa()
+    data = request.get_json()
+    log_callback(integration.callback_log, data)
+
+    try:
+        record = parse_callback(data)
+    except (KeyError, TypeError, ValueError):
+        return jsonify ({'error' : 'invalid callback data'}), 400
+
+    integration.callback_writer.submit(record)
+    return jsonify ({'message' : 'Callback received!'}), 200
@@ -0,0 +1,142 @@
+import re
+
+from sqlalchemy import text
+
+from models import db, Accommodations, Rooms, Reviews
+
+KIND_CODES = {'accommodation': 1, 'room': 2, 'review': 3}
+KINDS = {code: kind for kind, code in KIND_CODES.items()}
+MAX_TERMS = 16
+
+
+def query_terms(q):
+    """Split user input into plain word tokens, which are safe to hand to either backend."""
+    return re.findall(r'\w+', (q or '').lower())[:MAX_TERMS]
+
+
+class SqliteSearchBackend:
+    """FTS5 index for local development and tests, ranked with its built-in BM25.
+
+    Documents are keyed by rowid = ref * 8 + kind code, so updates and
+    deletes are rowid lookups rather than scans of the index.
+    """
+
+    def __init__(self):
+        self._ready = False
+
+    def _ensure(self):
+        if not self._ready:
+            db.session.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(body, tokenize='porter unicode61')"
+            ))
+            self._ready = True
+
+    def upsert(self, kind, ref, body):
+        self.remove(kind, ref)
+        db.session.execute(
+            text("INSERT INTO search_index (rowid, body) VALUES (:rowid, :body)"),
+            {'rowid': ref * 8 + KIND_CODES[kind], 'body': body}
+        )
+
+    def remove(self, kind, ref):
+        self._ensure()
+        db.session.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), {'rowid': ref * 8 + KIND_CODES[kind]})
+
+    def clear(self):
+        self._ensure()
+        db.session.execute(text("DELETE FROM search_index"))
+
+    def search(self, terms, kind, limit):
+        self._ensure()
+        sql = "SELECT rowid, bm25(search_index) FROM search_index WHERE search_index MATCH :match"
+        params = {'match': ' OR '.join(f'"{term}"' for term in terms), 'limit': limit}
+        if kind:
+            sql += " AND rowid % 8 = :code"
+            params['code'] = KIND_CODES[kind]
+        rows = db.session.execute(text(sql + " ORDER BY bm25(search_index) LIMIT :limit"), params)
+        return [(KINDS[rowid % 8], rowid // 8, -rank) for rowid, rank in rows]
+
+
+class PostgresSearchBackend:
+    """search_document table with a generated tsvector column and a GIN index.
+
+    PostgreSQL has no BM25, so results are ranked with ts_rank_cd, which
+    also weighs term frequency against document length.
+    """
+
+    def upsert(self, kind, ref, body):
+        db.session.execute(text(
+            "INSERT INTO search_document (kind, ref, body) VALUES (:kind, :ref, :body) "
+            "ON CONFLICT (kind, ref) DO UPDATE SET body = EXCLUDED.body"
+        ), {'kind': kind, 'ref': ref, 'body': body})
+
+    def remove(self, kind, ref):
+        db.session.execute(text("DELETE FROM search_document WHERE kind = :kind AND ref = :ref"), {'kind': kind, 'ref': ref})
+
+    def clear(self):
+        db.session.execute(text("DELETE FROM search_document"))
+
+    def search(self, terms, kind, limit):
+        sql = (
+            "SELECT kind, ref, ts_rank_cd(document, query, 32) AS score "
+            "FROM search_document, to_tsquery('english', :query) query "
+            "WHERE document @@ query"
+        )
+        params = {'query': ' | '.join(terms), 'limit': limit}
+        if kind:
+            sql += " AND kind = :kind"
+            params['kind'] = kind
+        rows = db.session.execute(text(sql + " ORDER BY score DESC LIMIT :limit"), params)
+        return [(kind, ref, score) for kind, ref, score in rows]
+
+
+class SearchIndex:
+    """Keeps the full-text index in step with accommodations, rooms and reviews.
+
+    Writes join the caller's transaction, so they commit or roll back with
+    the change that triggered them.
+    """
+
+    def __init__(self):
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if db.engine.dialect.name == 'postgresql':
+                self._backend = PostgresSearchBackend()
+            else:
+                self._backend = SqliteSearchBackend()
+        return self._backend
+
+    def index_accommodation(self, accommodation):
+        self.backend.upsert('accommodation', accommodation.id, f'{accommodation.name} {accommodation.description}')
+
+    def index_room(self, room):
+        self.backend.upsert('room', room.id, f'{room.room_type} {room.description}')
+
+    def index_review(self, review):
+        self.backend.upsert('review', review.id, review.content or '')
+
+    def remove(self, kind, ref):
+        self.backend.remove(kind, ref)
+
+    def search(self, q, kind=None, limit=20):
+        """Return [(kind, id, score)] best match first."""
+        terms = query_terms(q)
+        if not terms:
+            return []
+        return self.backend.search(terms, kind, limit)
+
+    def rebuild(self):
+        self.backend.clear()
+        for accommodation in Accommodations.query.yield_per(500):
+            self.index_accommodation(accommodation)
+        for room in Rooms.query.yield_per(500):
+            self.index_room(room)
+        for review in Reviews.query.yield_per(500):
+            self.index_review(review)
+        db.session.commit()
+
+
+search_index = SearchIndex()
@@ -0,0 +1,71 @@
+from datetime import date, datetime, time
+
+from models import Accommodations, Rooms, Reviews, User, User_verification, Password_reset
+
+
+def _formatter(model, column):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+
+    if issubclass(python_type, datetime):
+        fmt = model.datetime_format
+    elif issubclass(python_type, date):
+        fmt = model.date_format
+    elif issubclass(python_type, time):
+        fmt = model.time_format
+    else:
+        return None
+    return lambda value: value.strftime(fmt) if value is not None else None
+
+
+def compile_serializer(model, nested=None, exclude=()):
+    """Build a row -> dict function matching model.to_dict() for the given nesting.
+
+    Columns and their date formats are resolved once here instead of on every
+    row. nested maps relationship names to the compiled serializer of the
+    related model and should mirror what serialize_rules keeps; columns named
+    in exclude are left out.
+    """
+    plain = []
+    formatted = []
+    for attr in model.__mapper__.column_attrs:
+        if attr.key in exclude:
+            continue
+        fmt = _formatter(model, attr.columns[0])
+        if fmt:
+            formatted.append((attr.key, fmt))
+        else:
+            plain.append(attr.key)
+
+    for name, serialize in (nested or {}).items():
+        if model.__mapper__.relationships[name].uselist:
+            formatted.append((name, lambda rows, serialize=serialize: [serialize(row) for row in rows]))
+        else:
+            formatted.append((name, lambda row, serialize=serialize: serialize(row) if row is not None else None))
+
+    def serialize(row):
+        data = {name: getattr(row, name) for name in plain}
+        for name, fmt in formatted:
+            data[name] = fmt(getattr(row, name))
+        return data
+
+    return serialize
+
+
+accommodation_dict = compile_serializer(Accommodations)
+
+room_dict = compile_serializer(Rooms, nested={'accommodations': accommodation_dict})
+
+review_dict = compile_serializer(Reviews, nested={
+    'user': compile_serializer(User, nested={
+        'user_verification': compile_serializer(User_verification),
+        'password_reset': compile_serializer(Password_reset),
+    }),
+})
+
+# For unauthenticated responses: the author's id and name, never their password hash, email or reset tokens
+public_review_dict = compile_serializer(Reviews, nested={
+    'user': compile_serializer(User, exclude=('password', 'email', 'role')),
+})
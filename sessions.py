@@ -0,0 +1,24 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import record_outbound
+
+
+def make_session(retries=3, backoff=0.5, pool_size=10):
+    """A keep-alive session that retries idempotent requests on connection errors and 5xx.
+
+    POSTs are never retried: resending an STK push would prompt the customer twice.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET'})
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(record_outbound)
+    return session
@@ -0,0 +1,111 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Cheap hashes, no replicas and no profiler, before any app module reads them
+os.environ['BCRYPT_LOG_ROUNDS'] = '4'
+os.environ['DATABASE_REPLICA_URLS'] = ''
+os.environ['SQL_PROFILER'] = 'off'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from cache import catalog_cache
+from models import db
+from search import search_index
+
+# A valid POST /accommodations body
+ACCOMMODATION = {'name': 'Hostel', 'image': 'i', 'description': 'd', 'latitude': 1.0, 'longitude': 2.0}
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        # A file rather than :memory: so threads in the stress tests share one database
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        # Identities are {'id', 'name', 'email', 'role'} dicts, not string subjects
+        'JWT_VERIFY_SUB': False,
+    })
+    catalog_cache.clear()
+    search_index._backend = None
+    with app.app_context():
+        db.create_all(bind_key=None)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth(app):
+    """auth(id, role) -> Authorization header for that identity."""
+    def headers(id=1, role='user'):
+        with app.app_context():
+            token = create_access_token(identity={'id': id, 'name': f'user{id}', 'email': f'user{id}@example.com', 'role': role})
+        return {'Authorization': f'Bearer {token}'}
+    return headers
+
+
+class StubServer:
+    """A local HTTP server standing in for a third-party API.
+
+    routes maps a path to handler(method, query) -> (status, json body);
+    unrouted paths answer 404. Every request is recorded as (method, path, query).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def handle_request(self):
+                url = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.requests.append((self.command, url.path, query))
+                handler = stub.routes.get(url.path)
+                status, body = handler(self.command, query) if handler else (404, {})
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self._server.server_port}{path}'
+
+    def calls(self, path):
+        return [request for request in self.requests if request[1] == path]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
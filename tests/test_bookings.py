@@ -0,0 +1,80 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from models import db, User, Accommodations, Rooms, Booking
+
+REQUESTS = 200
+# SQLite waits up to 5s for a write lock, so a request stuck past that has stalled rather than queued
+P99_SECONDS = 5.0
+
+# Two overlapping stays and one clear of both; every request asks for one of them
+STAYS = [
+    ('2025-01-01 10:00', '2025-02-05 10:00'),
+    ('2025-02-01 10:00', '2025-03-05 10:00'),
+    ('2025-03-10 10:00', '2025-04-15 10:00'),
+]
+
+
+def seed_room(app):
+    with app.app_context():
+        db.session.add(User(id=1, name='user1', email='user1@example.com', password='x', role='user'))
+        db.session.add(Accommodations(id=1, name='Hostel', image='i', description='d', latitude=1.0, longitude=2.0))
+        db.session.add(Rooms(id=1, room_no=1, room_type='single', accommodation_id=1, price=6000, image='i', description='d'))
+        db.session.commit()
+
+
+def test_parallel_bookings_never_overlap(app, auth):
+    seed_room(app)
+    headers = auth(1, 'user')
+    start = threading.Barrier(REQUESTS)
+
+    def book(n):
+        stay_start, stay_end = STAYS[n % len(STAYS)]
+        client = app.test_client()
+        start.wait()
+        began = time.perf_counter()
+        response = client.post('/bookings', headers=headers, json={
+            'accommodation_id': 1, 'room_id': 1, 'start_date': stay_start, 'end_date': stay_end,
+        })
+        return response.status_code, time.perf_counter() - began
+
+    with ThreadPoolExecutor(max_workers=REQUESTS) as pool:
+        results = list(pool.map(book, range(REQUESTS)))
+
+    statuses = [status for status, _ in results]
+    assert set(statuses) <= {201, 400}
+
+    with app.app_context():
+        bookings = Booking.query.order_by(Booking.start_date).all()
+    assert len(bookings) == statuses.count(201) == 2
+    for earlier, later in zip(bookings, bookings[1:]):
+        assert earlier.end_date <= later.start_date
+
+    latencies = sorted(seconds for _, seconds in results)
+    assert latencies[int(len(latencies) * 0.99) - 1] < P99_SECONDS
+
+
+def test_canceled_booking_frees_the_room(app, client, auth):
+    seed_room(app)
+    headers = auth(1, 'user')
+    stay = {'accommodation_id': 1, 'room_id': 1, 'start_date': STAYS[0][0], 'end_date': STAYS[0][1]}
+
+    first = client.post('/bookings', headers=headers, json=stay)
+    assert first.status_code == 201
+    assert client.post('/bookings', headers=headers, json=stay).status_code == 400
+
+    assert client.patch(f"/bookings/{first.get_json()['id']}/cancel", headers=headers).status_code == 200
+    assert client.post('/bookings', headers=headers, json=stay).status_code == 201
+
+
+def test_booked_dates_leave_out_canceled_bookings(app, client, auth):
+    seed_room(app)
+    headers = auth(1, 'user')
+    stays = [client.post('/bookings', headers=headers, json={
+        'accommodation_id': 1, 'room_id': 1, 'start_date': stay_start, 'end_date': stay_end,
+    }).get_json() for stay_start, stay_end in (STAYS[0], STAYS[2])]
+
+    assert client.patch(f"/bookings/{stays[0]['id']}/cancel", headers=headers).status_code == 200
+    response = client.get('/rooms/1/booked-dates', headers=headers)
+    assert response.get_json() == {'booked_dates': [{'start_date': '2025-03-10', 'end_date': '2025-04-15'}]}
@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from bulk import Importer
+from conftest import ACCOMMODATION
+from models import db, Accommodations, Booking, Payments, Rooms, User
+
+ROOM = {'room_type': 'single', 'availability': 'true', 'image': 'i', 'description': 'd'}
+
+
+def rooms_csv(*rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=('room_no', 'room_type', 'price', 'accommodation_id', 'availability', 'image', 'description'))
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(dict(ROOM, **row))
+    return buffer.getvalue().encode()
+
+
+def add_accommodation(client, auth):
+    assert client.post('/accommodations', json=ACCOMMODATION, headers=auth(1, 'admin')).status_code == 201
+
+
+def test_import_reports_each_bad_row_by_line_and_keeps_the_rest(app, client, auth):
+    add_accommodation(client, auth)
+    body = rooms_csv(
+        {'room_no': 1, 'price': 6000, 'accommodation_id': 1},
+        {'room_no': 101, 'price': 6000, 'accommodation_id': 1},
+        {'room_no': 2, 'price': 'cheap', 'accommodation_id': 1},
+        {'room_no': 3, 'price': 6000, 'accommodation_id': 9},
+        {'room_no': 1, 'price': 7000, 'accommodation_id': 1},
+        {'room_no': 4, 'price': 6000, 'accommodation_id': 1},
+    )
+
+    response = client.post('/admin/import?type=rooms', data=body, content_type='text/csv', headers=auth(1, 'admin'))
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'kind': 'rooms',
+        'inserted': 2,
+        'failed': 4,
+        'errors': [
+            {'line': 3, 'error': 'Hostel rooms must be between 1 and 100 respectively!'},
+            {'line': 4, 'error': 'price must be a whole number!'},
+            {'line': 5, 'error': 'Accommodation not found!'},
+            {'line': 6, 'error': 'A room with this number already exists in the selected accommodation!'},
+        ],
+    }
+    with app.app_context():
+        assert sorted(room_no for room_no, in db.session.query(Rooms.room_no)) == [1, 4]
+
+
+def test_each_chunk_commits_on_its_own_and_sees_the_ones_before(app, client, auth):
+    add_accommodation(client, auth)
+    body = rooms_csv(*({'room_no': room_no, 'price': 6000, 'accommodation_id': 1} for room_no in (1, 2, 3, 1, 4)))
+
+    with app.app_context():
+        importer = Importer('rooms', 'csv', chunk_size=2)
+        report = importer.run(io.BytesIO(body))
+    assert report['inserted'] == 4
+    assert report['errors'] == [{'line': 5, 'error': 'A room with this number already exists in the selected accommodation!'}]
+
+
+def test_ndjson_import_checks_json_types(app, client, auth):
+    lines = [
+        json.dumps({'name': 'Amina', 'email': 'amina@example.com', 'password': 'secret123'}),
+        'not json',
+        json.dumps(['a', 'list']),
+        json.dumps({'name': 'Brian', 'email': 'brian@example.com', 'password': 'short'}),
+        json.dumps({'name': 'Amina', 'email': 'amina@example.com', 'password': 'secret456'}),
+        json.dumps({'name': 7, 'email': 'seven@example.com', 'password': 'secret789'}),
+    ]
+    response = client.post('/admin/import?type=users&format=ndjson', data='\n'.join(lines).encode(), headers=auth(1, 'admin'))
+
+    report = response.get_json()
+    assert report['inserted'] == 1
+    assert [(error['line'], error['error']) for error in report['errors']] == [
+        (2, 'Each line must be a JSON object!'),
+        (3, 'Each line must be a JSON object!'),
+        (4, 'Password must be at least 8 characters long and contain both letters and numbers.'),
+        (5, 'Email already exists!'),
+        (6, 'name must be text!'),
+    ]
+    with app.app_context():
+        assert User.query.filter_by(email='amina@example.com').one().role == 'user'
+
+
+def test_import_and_export_are_admin_only(client, auth):
+    assert client.post('/admin/import?type=rooms', data=b'', headers=auth(1, 'user')).status_code == 403
+    assert client.get('/admin/export?type=rooms', headers=auth(1, 'user')).status_code == 403
+    assert client.get('/admin/export?type=bookings', headers=auth(1, 'admin')).status_code == 400
+
+
+def test_export_streams_csv_and_ndjson(app, client, auth):
+    add_accommodation(client, auth)
+    client.post('/admin/import?type=rooms', data=rooms_csv(
+        {'room_no': 1, 'price': 6000, 'accommodation_id': 1},
+        {'room_no': 2, 'price': 7000, 'accommodation_id': 1, 'availability': 'no'},
+    ), content_type='text/csv', headers=auth(1, 'admin'))
+
+    response = client.get('/admin/export?type=rooms&format=csv', headers=auth(1, 'admin'))
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=rooms.csv'
+    assert list(csv.reader(io.StringIO(response.get_data(as_text=True)))) == [
+        ['id', 'room_no', 'room_type', 'price', 'accommodation_id', 'availability', 'image', 'description'],
+        ['1', '1', 'single', '6000', '1', 'True', 'i', 'd'],
+        ['2', '2', 'single', '7000', '1', 'False', 'i', 'd'],
+    ]
+
+    response = client.get('/admin/export?type=accommodations&format=ndjson', headers=auth(1, 'admin'))
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == [
+        dict(ACCOMMODATION, id=1),
+    ]
+
+
+def test_user_export_leaves_out_passwords(app, client, auth):
+    with app.app_context():
+        db.session.add(User(id=1, name='Amina', email='amina@example.com', password='$2b$04$hash', role='admin'))
+        db.session.commit()
+
+    body = client.get('/admin/export?type=users', headers=auth(1, 'admin')).get_data(as_text=True)
+    assert [json.loads(line) for line in body.splitlines()] == [{'id': 1, 'name': 'Amina', 'email': 'amina@example.com', 'role': 'admin'}]
+
+
+def seed_bookings(app):
+    """Three stays in room 1: January (paid twice), February (canceled) and March (no status, paid once)."""
+    with app.app_context():
+        db.session.add(User(id=1, name='Amina', email='amina@example.com', password='x', role='user'))
+        db.session.add(Accommodations(id=1, **ACCOMMODATION))
+        db.session.add(Rooms(id=1, room_no=1, room_type='single', accommodation_id=1, price=6000, image='i', description='d'))
+        for id, month, status in ((1, 1, 'confirmed'), (2, 2, 'canceled'), (3, 3, None)):
+            db.session.add(Booking(id=id, user_id=1, accommodation_id=1, room_id=1, status=status,
+                                   start_date=datetime(2025, month, 1), end_date=datetime(2025, month, 20)))
+        db.session.flush()
+        db.session.execute(Booking.__table__.update().where(Booking.id == 3).values(status=None))
+        for booking_id, amount, day in ((1, 4000, 2), (1, 2000, 9), (3, 6000, 3), (None, 999, 4)):
+            db.session.add(Payments(booking_id=booking_id, payment_amount=amount, payment_date=datetime(2025, 1, day)))
+        db.session.commit()
+
+
+def export(client, auth, query=''):
+    response = client.get(f'/bookings/export?{query}', headers=auth(1, 'admin'))
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response
+
+
+def test_booking_export_streams_payment_totals_as_ndjson(app, client, auth):
+    seed_bookings(app)
+    response = export(client, auth)
+
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(row['id'], row['status'], row['payment_count'], row['amount_paid']) for row in rows] == [
+        (1, 'confirmed', 2, 6000),
+        (2, 'canceled', 0, 0),
+        (3, 'confirmed', 1, 6000),
+    ]
+    assert rows[0]['user_email'] == 'amina@example.com'
+    assert rows[0]['accommodation_name'] == 'Hostel'
+    assert rows[0]['last_payment_date'] == '2025-01-09 00:00:00'
+    assert rows[1]['last_payment_date'] is None
+
+
+def test_booking_export_as_csv(app, client, auth):
+    seed_bookings(app)
+    response = export(client, auth, 'format=csv')
+
+    assert response.headers['Content-Disposition'] == 'attachment; filename=bookings.csv'
+    header, *rows = csv.reader(io.StringIO(response.get_data(as_text=True)))
+    assert header == [
+        'id', 'user_id', 'user_name', 'user_email', 'accommodation_id', 'accommodation_name', 'room_id', 'room_no',
+        'start_date', 'end_date', 'status', 'payment_count', 'amount_paid', 'last_payment_date',
+    ]
+    assert [row[0] for row in rows] == ['1', '2', '3']
+    assert rows[0][8:] == ['2025-01-01 00:00:00', '2025-01-20 00:00:00', 'confirmed', '2', '6000', '2025-01-09 00:00:00']
+
+
+def test_booking_export_filters_by_stay_and_status(app, client, auth):
+    seed_bookings(app)
+    ids = lambda query: [json.loads(line)['id'] for line in export(client, auth, query).get_data(as_text=True).splitlines()]
+
+    # Stays overlapping the range, not just starting in it
+    assert ids('start_date=2025-01-15&end_date=2025-02-10') == [1, 2]
+    assert ids('start_date=2025-02-25') == [3]
+    assert ids('end_date=2025-01-01') == []
+    # Rows saved before status had a default count as confirmed
+    assert ids('status=confirmed') == [1, 3]
+    assert ids('status=canceled&start_date=2025-02-01') == [2]
+
+
+def test_booking_export_rejects_bad_filters(app, client, auth):
+    headers = auth(1, 'admin')
+    assert client.get('/bookings/export', headers=auth(1, 'user')).status_code == 403
+    assert client.get('/bookings/export?format=xml', headers=headers).status_code == 400
+    assert client.get('/bookings/export?start_date=yesterday', headers=headers).status_code == 400
+    assert client.get('/bookings/export?start_date=2025-02-01&end_date=2025-01-01', headers=headers).status_code == 400
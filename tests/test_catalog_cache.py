@@ -0,0 +1,53 @@
+from cache import CatalogCache
+from conftest import ACCOMMODATION
+
+
+class FakeShared:
+    """The get/set/incr subset of a redis client, as one worker sees the shared tier."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key) or 0) + 1
+        return self.values[key]
+
+
+def test_not_found_is_not_cached(client, auth):
+    assert client.get('/accommodations/1').status_code == 404
+    assert client.post('/accommodations', json=ACCOMMODATION, headers=auth(1, 'admin')).status_code == 201
+
+    response = client.get('/accommodations/1')
+    assert response.status_code == 200
+    assert response.get_json()['name'] == 'Hostel'
+
+
+def test_shared_tier_invalidates_every_worker():
+    shared = FakeShared()
+    worker_a, worker_b = CatalogCache(shared=shared), CatalogCache(shared=shared)
+    versions = iter(range(10))
+    load = lambda: ({'version': next(versions)}, 200)
+
+    assert worker_a.get_or_load(('rooms:1',), '/rooms', load) == ({'version': 0}, 200)
+    assert worker_b.get_or_load(('rooms:1',), '/rooms', load) == ({'version': 0}, 200)
+    assert worker_b.stats()['shared_hits'] == 1
+
+    worker_a.invalidate('rooms:1')
+    assert worker_b.get_or_load(('rooms:1',), '/rooms', load) == ({'version': 1}, 200)
+
+
+def test_stats_are_exported_on_metrics(client, auth):
+    assert client.post('/accommodations', json=ACCOMMODATION, headers=auth(1, 'admin')).status_code == 201
+    client.get('/accommodations/1')
+    client.get('/accommodations/1')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'catalog_cache_lookups_total{result="miss"}' in body
+    assert 'catalog_cache_lookups_total{result="hit"}' in body
+    assert 'catalog_cache_hit_ratio ' in body
+    assert 'catalog_cache_entries ' in body
@@ -0,0 +1,26 @@
+from conftest import ACCOMMODATION
+from models import db, Accommodations
+
+
+def rename_elsewhere(app, name):
+    """Update the row the way another worker would: committed, but without touching this process's cache."""
+    with app.app_context():
+        Accommodations.query.get(1).name = name
+        db.session.commit()
+
+
+def test_body_matches_its_etag_after_an_update_elsewhere(app, client, auth):
+    client.post('/accommodations', json=ACCOMMODATION, headers=auth(1, 'admin'))
+
+    for path, name in (('/accommodations/1', lambda body: body['name']),
+                       ('/accommodations', lambda body: body['items'][0]['name'])):
+        before = client.get(path)
+        rename_elsewhere(app, f'Renamed {path}')
+
+        after = client.get(path)
+        assert after.status_code == 200
+        assert after.headers['ETag'] != before.headers['ETag']
+        assert name(after.get_json()) == f'Renamed {path}'
+
+        assert client.get(path, headers={'If-None-Match': before.headers['ETag']}).status_code == 200
+        assert client.get(path, headers={'If-None-Match': after.headers['ETag']}).status_code == 304
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from email_validation import EmailValidator
+from sessions import make_session
+
+UNDELIVERABLE = {'nobody@example.com', 'a@no-mx.test', 'b@no-mx.test'}
+
+
+@pytest.fixture
+def api(stub):
+    def verify(method, query):
+        email = query['email']
+        if email.startswith('error'):
+            return 500, {}
+        return 200, {'data': {
+            'result': 'undeliverable' if email in UNDELIVERABLE else 'deliverable',
+            'mx_records': not email.endswith('@no-mx.test'),
+        }}
+    stub.routes['/verify'] = verify
+    return stub
+
+
+def validator(api, **ttls):
+    # No retries, so each lookup is one request to the stub
+    return EmailValidator(api.url('/verify'), 'key', session=make_session(retries=0), **ttls)
+
+
+def asked(api):
+    return [query['email'] for method, path, query in api.calls('/verify')]
+
+
+def test_results_are_cached_per_normalized_address_until_their_ttl(api):
+    emails = validator(api, positive_ttl=0.2, negative_ttl=0.2)
+
+    assert emails.is_real('Amina@Example.com') is True
+    assert emails.is_real(' amina@example.com ') is True
+    assert emails.is_real('nobody@example.com') is False
+    assert emails.is_real('nobody@example.com') is False
+    assert asked(api) == ['amina@example.com', 'nobody@example.com']
+
+    time.sleep(0.25)
+    assert emails.is_real('amina@example.com') is True
+    assert asked(api) == ['amina@example.com', 'nobody@example.com', 'amina@example.com']
+
+
+def test_undeliverable_results_expire_first(api):
+    emails = validator(api, positive_ttl=60, negative_ttl=0.1)
+    emails.is_real('amina@example.com')
+    emails.is_real('nobody@example.com')
+
+    time.sleep(0.15)
+    emails.is_real('amina@example.com')
+    emails.is_real('nobody@example.com')
+    assert asked(api) == ['amina@example.com', 'nobody@example.com', 'nobody@example.com']
+
+
+def test_gateway_errors_are_not_cached(api):
+    emails = validator(api)
+    assert emails.is_real('error@example.com') is False
+    assert emails.is_real('error@example.com') is False
+    assert asked(api) == ['error@example.com', 'error@example.com']
+
+
+def test_a_domain_without_mx_records_is_remembered(api):
+    emails = validator(api)
+    assert emails.is_real('a@no-mx.test') is False
+    assert emails.is_real('b@no-mx.test') is False
+    assert emails.is_real('c@NO-MX.test') is False
+    assert asked(api) == ['a@no-mx.test']
+
+
+def test_validate_many_asks_once_per_unseen_address(api):
+    emails = validator(api)
+    emails.is_real('amina@example.com')
+
+    results = emails.validate_many(['amina@example.com', 'Brian@example.com', 'brian@example.com', 'nobody@example.com'])
+    assert results == {
+        'amina@example.com': True,
+        'Brian@example.com': True,
+        'brian@example.com': True,
+        'nobody@example.com': False,
+    }
+    assert sorted(asked(api)) == ['amina@example.com', 'brian@example.com', 'nobody@example.com']
@@ -0,0 +1,98 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from models import db, Accommodations, Booking, Reviews, Rooms, User
+
+# Scaled down from the 1M bookings of the original request so the suite stays quick
+BOOKINGS = 200000
+USERS = 1000
+ROOMS = 500
+# A user who joined last: a handful of rows at the end of each table, so a scan reads everything first
+NEWCOMER = USERS + 1
+
+INDEXES = {
+    'ix_booking_user_id': 'booking (user_id)',
+    'ix_reviews_user_id': 'reviews (user_id)',
+}
+
+
+def seed(app):
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {'id': id, 'name': f'user{id}', 'email': f'user{id}@example.com', 'password': 'x', 'role': 'user'}
+            for id in range(1, NEWCOMER + 1)
+        ])
+        db.session.execute(Accommodations.__table__.insert(), [
+            {'id': id, 'name': f'Hostel {id}', 'image': 'i', 'description': 'd', 'latitude': 0.0, 'longitude': 0.0}
+            for id in range(1, 11)
+        ])
+        db.session.execute(Rooms.__table__.insert(), [
+            {'id': id, 'room_no': id, 'room_type': 'single', 'accommodation_id': id % 10 + 1, 'price': 5000,
+             'availability': True, 'image': 'i', 'description': 'd'}
+            for id in range(1, ROOMS + 1)
+        ])
+        bookings = [
+            {'user_id': n % USERS + 1, 'accommodation_id': n % 10 + 1, 'room_id': n % ROOMS + 1,
+             'start_date': start + timedelta(days=n % 365), 'end_date': start + timedelta(days=n % 365 + 3), 'status': 'confirmed'}
+            for n in range(BOOKINGS)
+        ]
+        bookings += [dict(bookings[n], user_id=NEWCOMER) for n in range(3)]
+        db.session.execute(Booking.__table__.insert(), bookings)
+        reviews = [
+            {'rating': n % 5 + 1, 'content': 'ok', 'user_id': n % USERS + 1, 'accommodation_id': n % 10 + 1}
+            for n in range(BOOKINGS)
+        ]
+        reviews += [dict(reviews[n], user_id=NEWCOMER) for n in range(3)]
+        db.session.execute(Reviews.__table__.insert(), reviews)
+        db.session.commit()
+
+
+def fastest(client, path, headers, runs=5):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return min(timings)
+
+
+def test_foreign_key_indexes_speed_up_the_per_user_endpoints(app, client, auth):
+    """Benchmark: each per-user endpoint with and without the indexes of migration 465f0fb3c0e7."""
+    seed(app)
+    headers = auth(NEWCOMER, 'user')
+    paths = ('/Userbookings', '/my-reviews')
+
+    indexed = {path: fastest(client, path, headers) for path in paths}
+    with app.app_context():
+        for name in INDEXES:
+            db.session.execute(text(f'DROP INDEX {name}'))
+        db.session.commit()
+    scanned = {path: fastest(client, path, headers) for path in paths}
+    with app.app_context():
+        for name, columns in INDEXES.items():
+            db.session.execute(text(f'CREATE INDEX {name} ON {columns}'))
+        db.session.commit()
+
+    report = ', '.join(f'{path} {scanned[path] * 1000:.1f} -> {indexed[path] * 1000:.1f} ms' for path in paths)
+    for path in paths:
+        assert indexed[path] * 2 < scanned[path], report
+
+
+@pytest.mark.parametrize('statement, index', [
+    ('SELECT * FROM booking WHERE user_id = 1', 'ix_booking_user_id'),
+    ('SELECT * FROM booking WHERE accommodation_id = 1', 'ix_booking_accommodation_id'),
+    ('SELECT * FROM reviews WHERE user_id = 1', 'ix_reviews_user_id'),
+    ('SELECT * FROM payments WHERE booking_id = 1', 'ix_payments_booking_id'),
+    ("SELECT * FROM booking WHERE room_id = 1 AND status != 'canceled' AND start_date < '2024-02-01' AND end_date > '2024-01-01'",
+     'ix_booking_room_dates_status'),
+    ('SELECT * FROM rooms WHERE accommodation_id = 1', 'ix_rooms_accommodation_price_type'),
+])
+def test_lookups_use_an_index(app, statement, index):
+    with app.app_context():
+        plan = ' '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')))
+    assert f'USING INDEX {index}' in plan or f'USING COVERING INDEX {index}' in plan, plan
@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+
+import pytest
+
+from app import create_app
+from metrics import Counter, Gauge, Histogram, Registry, registry
+
+
+def worker_registry(directory):
+    """The same metrics each worker process registers at import."""
+    metrics = Registry()
+    metrics.directory = directory
+    requests = metrics.register(Counter('requests_total', 'Requests.', ('endpoint',)))
+    latency = metrics.register(Histogram('latency_seconds', 'Latency.', ('endpoint',), buckets=(0.1, 1.0)))
+    metrics.register(Gauge('cache_entries', 'Entries.', (), lambda: {(): 7}))
+    return metrics, requests, latency
+
+
+def serve(directory, count):
+    metrics, requests, latency = worker_registry(directory)
+    for _ in range(count):
+        requests.inc(endpoint='/rooms')
+        latency.observe(0.5, endpoint='/rooms')
+    metrics.write()
+
+
+def test_a_scrape_adds_up_every_worker(tmp_path):
+    fork = multiprocessing.get_context('fork')
+    for count in (2, 3):
+        worker = fork.Process(target=serve, args=(str(tmp_path), count))
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 0
+
+    metrics, requests, latency = worker_registry(str(tmp_path))
+    requests.inc(endpoint='/rooms')
+    body = metrics.render()
+
+    assert 'requests_total{endpoint="/rooms"} 6' in body
+    assert 'latency_seconds_bucket{endpoint="/rooms",le="0.1"} 0' in body
+    assert 'latency_seconds_bucket{endpoint="/rooms",le="1.0"} 5' in body
+    assert 'latency_seconds_count{endpoint="/rooms"} 5' in body
+    # Each live worker reports its own gauge, and the two that exited wrote theirs moments ago
+    assert body.count('cache_entries{pid=') == 3
+    assert f'cache_entries{{pid="{os.getpid()}"}} 7' in body
+
+
+def test_gauges_of_workers_gone_quiet_are_dropped(tmp_path):
+    serve(str(tmp_path), 1)
+    [path] = tmp_path.iterdir()
+    os.utime(path, (0, 0))
+
+    metrics, _, _ = worker_registry(str(tmp_path))
+    body = metrics.render()
+    assert 'requests_total{endpoint="/rooms"} 1' in body
+    assert body.count('cache_entries{pid=') == 1
+
+
+@pytest.fixture
+def multiprocess_app(tmp_path, monkeypatch):
+    for name in ('directory', '_pid', '_path', '_flushing_pid'):
+        monkeypatch.setattr(registry, name, getattr(registry, name))
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'METRICS_MULTIPROC_DIR': str(tmp_path / 'metrics'),
+    })
+    return app
+
+
+def test_the_app_serves_totals_from_the_shared_directory(multiprocess_app, tmp_path):
+    client = multiprocess_app.test_client()
+    client.get('/')
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/",status="200"}' in body
+    assert 'catalog_cache_entries{pid=' in body
+    assert len(list((tmp_path / 'metrics').glob('metrics_*.json'))) == 1
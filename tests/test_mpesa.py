@@ -0,0 +1,86 @@
+import threading
+import time
+from itertools import count
+
+import pytest
+import requests
+
+from mpesa import MpesaGateway, TokenManager
+from sessions import make_session
+
+
+@pytest.fixture
+def oauth(stub):
+    """An OAuth endpoint that hands out tok1, tok2, ... each valid for stub.expires_in seconds."""
+    tokens = count(1)
+    stub.expires_in = 3599
+    stub.delay = 0
+
+    def generate(method, query):
+        time.sleep(stub.delay)
+        return 200, {'access_token': f'tok{next(tokens)}', 'expires_in': str(stub.expires_in)}
+    stub.routes['/oauth'] = generate
+    return stub
+
+
+def token_manager(stub, refresh_margin=60):
+    return TokenManager(make_session(backoff=0), stub.url('/oauth'), 'key', 'secret', refresh_margin=refresh_margin)
+
+
+def test_the_token_is_reused_until_shortly_before_it_expires(oauth):
+    tokens = token_manager(oauth)
+    assert tokens.get() == 'tok1'
+    assert tokens.get() == 'tok1'
+    assert len(oauth.calls('/oauth')) == 1
+
+
+def test_an_expiring_token_is_refreshed(oauth):
+    oauth.expires_in = 1
+    tokens = token_manager(oauth, refresh_margin=0.9)
+    assert tokens.get() == 'tok1'
+
+    time.sleep(0.15)
+    assert tokens.get() == 'tok2'
+    assert len(oauth.calls('/oauth')) == 2
+
+
+def test_a_burst_of_callers_triggers_one_token_fetch(oauth):
+    oauth.delay = 0.2
+    tokens = token_manager(oauth)
+    start = threading.Barrier(20)
+    results = []
+
+    def pay():
+        start.wait()
+        results.append(tokens.get())
+    threads = [threading.Thread(target=pay) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['tok1'] * 20
+    assert len(oauth.calls('/oauth')) == 1
+
+
+def test_a_rejected_token_is_fetched_again_for_the_next_push(oauth):
+    replies = iter([(401, {'errorMessage': 'Invalid Access Token'}), (200, {'CheckoutRequestID': 'ws_CO_1', 'ResponseCode': '0'})])
+    oauth.routes['/stkpush'] = lambda method, query: next(replies)
+    gateway = MpesaGateway(make_session(backoff=0), token_manager(oauth), oauth.url('/stkpush'), '174379', 'passkey', 'https://example.com/cb')
+
+    assert gateway.stk_push('254700000001', 10)[0] is False
+    assert gateway.stk_push('254700000001', 10) == (True, {'CheckoutRequestID': 'ws_CO_1', 'ResponseCode': '0'})
+    assert len(oauth.calls('/oauth')) == 2
+
+
+def test_only_gets_are_retried(stub):
+    stub.routes['/flaky'] = lambda method, query: (503, {'error': 'unavailable'})
+    session = make_session(retries=3, backoff=0)
+
+    with pytest.raises(requests.RequestException):
+        session.get(stub.url('/flaky'))
+    assert len(stub.calls('/flaky')) == 4
+
+    # Resending an STK push would prompt the customer twice
+    assert session.post(stub.url('/flaky'), json={}).status_code == 503
+    assert len(stub.calls('/flaky')) == 5
@@ -0,0 +1,112 @@
+import time
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from models import db, Payments, Payment_job
+from payment_callbacks import CallbackRecord, CallbackWriter, parse_callback
+
+
+def callback(receipt='R1', amount=100, checkout_request_id='ws_CO_1', result_code=0):
+    items = [
+        {'Name': 'Amount', 'Value': amount},
+        {'Name': 'MpesaReceiptNumber', 'Value': receipt},
+        {'Name': 'TransactionDate', 'Value': 20240105143000},
+        {'Name': 'PhoneNumber', 'Value': 254700000001},
+    ]
+    return {'Body': {'stkCallback': {
+        'MerchantRequestID': 'm',
+        'CheckoutRequestID': checkout_request_id,
+        'ResultCode': result_code,
+        'ResultDesc': 'ok',
+        'CallbackMetadata': {'Item': items},
+    }}}
+
+
+def record(receipt, amount=100, checkout_request_id=None):
+    return CallbackRecord(checkout_request_id, 0, 'ok', amount, receipt, 254700000001, 20240105143000)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def receipts(app):
+    with app.app_context():
+        return sorted(receipt for receipt, in db.session.query(Payments.mpesa_receipt_number))
+
+
+@pytest.fixture
+def writer(app):
+    return CallbackWriter(app, batch_size=2, flush_interval=0.2, retry_delay=0)
+
+
+def test_callbacks_are_written_in_batches_and_linked_to_their_booking(app, writer, monkeypatch):
+    with app.app_context():
+        db.session.add(Payment_job(id='job', phone_number='254700000001', amount=100, booking_id=None,
+                                   status='sent', checkout_request_id='ws_CO_1'))
+        db.session.commit()
+    sizes = []
+    write = writer.write
+    monkeypatch.setattr(writer, 'write', lambda records: sizes.append(len(records)) or write(records))
+
+    for n in range(5):
+        writer.submit(record(f'R{n}', checkout_request_id=f'ws_CO_{n}'))
+    wait_for(lambda: len(receipts(app)) == 5)
+
+    assert receipts(app) == ['R0', 'R1', 'R2', 'R3', 'R4']
+    assert sum(sizes) == 5 and max(sizes) <= 2
+    with app.app_context():
+        assert Payment_job.query.get('job').status == 'paid'
+        assert Payments.query.filter_by(mpesa_receipt_number='R1').one().checkout_request_id == 'ws_CO_1'
+
+
+def test_a_receipt_is_stored_once(app, writer):
+    writer._write_safely([record('R1'), record('R1')])
+    writer._write_safely([record('R1'), record('R2')])
+    assert receipts(app) == ['R1', 'R2']
+
+
+def test_a_bad_record_only_loses_its_own_row(app, writer):
+    assert writer._write_safely([record('R1'), record('R2', amount='abc'), record('R3')])
+    assert receipts(app) == ['R1', 'R3']
+
+
+def test_an_unreachable_database_requeues_the_batch(app, writer, monkeypatch):
+    write = writer.write
+
+    def down(records):
+        monkeypatch.setattr(writer, 'write', write)
+        raise OperationalError('INSERT', {}, Exception('database is locked'))
+    monkeypatch.setattr(writer, 'write', down)
+
+    assert writer._write_safely([record('R1'), record('R2')]) is False
+    assert receipts(app) == []
+    writer.flush()
+    assert receipts(app) == ['R1', 'R2']
+
+
+@pytest.mark.parametrize('amount', ['abc', None, 0, -5, 10.5, True, [1]])
+def test_a_callback_with_a_bad_amount_is_refused(amount):
+    with pytest.raises((KeyError, TypeError, ValueError)):
+        parse_callback(callback(amount=amount))
+
+
+def test_parse_callback_checks_the_receipt_and_normalises_the_amount():
+    assert parse_callback(callback(amount='100.0')).amount == 100
+    for receipt in (12345, 'R' * 51):
+        with pytest.raises(ValueError):
+            parse_callback(callback(receipt=receipt))
+    # A failed payment carries no metadata worth checking
+    assert parse_callback(callback(amount='abc', result_code=1032)).result_code == 1032
+
+
+def test_the_endpoint_refuses_a_poison_callback_before_acknowledging_it(app, client, tmp_path):
+    app.config['MPESA_CALLBACK_LOG'] = str(tmp_path / 'callbacks.log')
+
+    assert client.post('/mpesa/callback', json=callback(receipt='R9', amount='abc')).status_code == 400
+    assert client.post('/mpesa/callback', json=callback(receipt='R3')).status_code == 200
+    wait_for(lambda: receipts(app))
+    assert receipts(app) == ['R3']
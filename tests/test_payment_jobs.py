@@ -0,0 +1,61 @@
+import threading
+from datetime import datetime, timedelta
+
+from models import db, Payment_job
+from payment_jobs import PaymentQueue
+
+
+class FakeGateway:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def stk_push(self, phone_number, amount):
+        with self.lock:
+            self.calls.append(phone_number)
+        return True, {'CheckoutRequestID': f'ws_CO_{len(self.calls)}', 'ResponseCode': '0'}
+
+
+def add_job(app, id, status, age):
+    with app.app_context():
+        db.session.add(Payment_job(id=id, phone_number=f'2547{id}', amount=10, status=status,
+                                   updated_at=datetime.utcnow() - timedelta(seconds=age)))
+        db.session.commit()
+
+
+def statuses(app):
+    with app.app_context():
+        return {job.id: job.status for job in Payment_job.query}
+
+
+def test_sweep_requeues_abandoned_jobs_and_fails_interrupted_ones(app):
+    gateway = FakeGateway()
+    queue = PaymentQueue(app, gateway, workers=1, stale_after=60, sweep_every=0)
+    add_job(app, 'queued_old', 'queued', 600)
+    add_job(app, 'queued_new', 'queued', 0)
+    add_job(app, 'processing_old', 'processing', 600)
+    add_job(app, 'sent_old', 'sent', 600)
+
+    assert queue.sweep() == (1, 1)
+    queue._executor.shutdown(wait=True)
+
+    assert statuses(app) == {
+        'queued_old': 'sent',
+        'queued_new': 'queued',
+        'processing_old': 'failed',
+        'sent_old': 'sent',
+    }
+    assert gateway.calls == ['2547queued_old']
+
+
+def test_a_job_is_pushed_once_when_two_workers_pick_it_up(app):
+    gateway = FakeGateway()
+    worker_a = PaymentQueue(app, gateway, workers=1, sweep_every=0)
+    worker_b = PaymentQueue(app, gateway, workers=1, sweep_every=0)
+    add_job(app, 'job', 'queued', 0)
+
+    worker_a._run('job')
+    worker_b._run('job')
+
+    assert gateway.calls == ['2547job']
+    assert statuses(app) == {'job': 'sent'}
@@ -0,0 +1,69 @@
+import pytest
+from flask import Response, g
+
+import profiler
+from app import create_app
+from models import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'SQL_PROFILER': 'header',
+    })
+    with app.app_context():
+        db.create_all(bind_key=None)
+    yield app
+    profiler.reports.clear()
+
+
+@pytest.fixture
+def explained(monkeypatch):
+    calls = []
+
+    def explain(engine, statement, parameters, analyze=True):
+        calls.append((engine, statement, analyze))
+        return [], []
+    monkeypatch.setattr(profiler, 'explain', explain)
+    return calls
+
+
+def query(engine, sql, ms):
+    return {'engine': engine, 'sql': sql, 'parameters': (), 'executemany': False, 'ms': ms}
+
+
+@pytest.mark.parametrize('statement, locks', [
+    ('SELECT * FROM rooms WHERE id = ?', False),
+    ('SELECT * FROM rooms WHERE id = %(id)s FOR UPDATE', True),
+    ('SELECT * FROM rooms FOR NO KEY UPDATE OF rooms', True),
+    ('SELECT * FROM rooms\nFOR SHARE', True),
+    ("SELECT * FROM rooms WHERE description = 'for updates'", False),
+])
+def test_locking_reads_are_recognised(statement, locks):
+    assert profiler.takes_row_locks(statement) is locks
+
+
+def test_locking_reads_are_only_estimated_on_the_engine_that_ran_them(app, explained):
+    primary, replica = object(), object()
+    with app.test_request_context('/rooms/1/book'):
+        g.sql_profile = {'explaining': False, 'queries': [
+            query(primary, 'SELECT rooms.id FROM rooms WHERE rooms.id = %(id)s FOR UPDATE', 30),
+            query(replica, 'SELECT rooms.id FROM rooms', 20),
+            query(primary, 'INSERT INTO booking (room_id) VALUES (%(room_id)s)', 10),
+        ]}
+        profiler.finish_profile(Response())
+
+    assert explained == [
+        (primary, 'SELECT rooms.id FROM rooms WHERE rooms.id = %(id)s FOR UPDATE', False),
+        (replica, 'SELECT rooms.id FROM rooms', True),
+    ]
+
+
+def test_a_profiled_request_explains_its_reads(app):
+    response = app.test_client().get('/accommodations', headers={profiler.PROFILE_HEADER: '1'})
+    assert int(response.headers['X-SQL-Query-Count']) > 0
+
+    report = profiler.reports.snapshot()['/accommodations']
+    assert report['slowest'] and all(isinstance(query['plan'], list) for query in report['slowest'])
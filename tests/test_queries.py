@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from cache import catalog_cache
+from models import db, User, Accommodations, Rooms, Booking, Reviews
+
+
+@contextmanager
+def counting_queries(app):
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    record = lambda conn, cursor, statement, parameters, context, executemany: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def add_rows(app, start, count):
+    """Give each row its own user, accommodation and room so lazy loads would show up per row."""
+    with app.app_context():
+        for n in range(start, start + count):
+            db.session.add(User(id=n, name=f'user{n}', email=f'user{n}@example.com', password='x', role='user'))
+            db.session.add(Accommodations(id=n, name=f'Hostel {n}', image='i', description='d', latitude=1.0, longitude=2.0))
+            db.session.add(Rooms(id=n, room_no=1, room_type='single', accommodation_id=n, price=6000, image='i', description='d'))
+            stay = datetime(2025, 1, 1) + timedelta(days=40 * n)
+            db.session.add(Booking(user_id=n, accommodation_id=n, room_id=n, start_date=stay, end_date=stay + timedelta(days=30)))
+            # Every review is user 1's, so /my-reviews grows with the table
+            db.session.add(Reviews(user_id=1, rating=4, content='fine', accommodation_id=n))
+        db.session.commit()
+
+
+@pytest.mark.parametrize('path, role', [
+    ('/Userbookings', 'admin'),
+    ('/bookings', 'admin'),
+    ('/rooms', 'user'),
+    ('/reviews', 'user'),
+    ('/my-reviews', 'user'),
+])
+def test_listing_query_count_does_not_grow_with_rows(app, client, auth, path, role):
+    headers = auth(1, role)
+
+    add_rows(app, 1, 2)
+    with counting_queries(app) as few:
+        assert client.get(path, headers=headers).status_code == 200
+
+    add_rows(app, 3, 8)
+    catalog_cache.clear()
+    with counting_queries(app) as many:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200
+
+    body = response.get_json()
+    assert len(body['items'] if isinstance(body, dict) else body) == 10
+    assert len(many) == len(few)
@@ -0,0 +1,21 @@
+from conftest import ACCOMMODATION
+from models import db, Accommodation_rating, Reviews
+
+
+def test_deleting_an_accommodation_clears_its_rating_and_reviews(app, client, auth):
+    admin = auth(1, 'admin')
+    client.post('/accommodations', json=ACCOMMODATION, headers=admin)
+    client.post('/accommodations', json=ACCOMMODATION, headers=admin)
+    client.post('/reviews', json={'rating': 4, 'content': 'fine', 'accommodation_id': 2}, headers=auth(1, 'user'))
+
+    assert client.delete('/accommodations/2', headers=admin).status_code == 200
+    with app.app_context():
+        assert Accommodation_rating.query.get(2) is None
+        assert db.session.query(Reviews.accommodation_id).scalar() is None
+
+    # SQLite hands the deleted id out again
+    response = client.post('/accommodations', json=ACCOMMODATION, headers=admin)
+    assert response.status_code == 201
+    assert response.get_json()['id'] == 2
+    with app.app_context():
+        assert Accommodation_rating.query.get(2).review_count == 0
@@ -0,0 +1,92 @@
+import shutil
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from models import db, Accommodations, Payment_job, User
+from replicas import pins, router
+from search import search_index
+
+REPLICAS = ('replica_0', 'replica_1')
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A primary and two replica copies; each copy names the accommodation after itself."""
+    primary = tmp_path / 'primary.db'
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{primary}',
+        'SQLALCHEMY_BINDS': {name: f"sqlite:///{tmp_path / name}.db" for name in REPLICAS},
+        'JWT_VERIFY_SUB': False,
+    })
+    search_index._backend = None
+    router.reset()
+    pins._until.clear()
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.session.add(User(id=1, name='user1', email='user1@example.com', password='x', role='user'))
+        db.session.add(Accommodations(id=1, name='primary', image='i', description='d', latitude=1.0, longitude=2.0))
+        db.session.commit()
+        db.engine.dispose()
+    for name in REPLICAS:
+        shutil.copy(primary, tmp_path / f'{name}.db')
+        with sqlite3.connect(tmp_path / f'{name}.db') as conn:
+            conn.execute('UPDATE accommodations SET name = ?', (name,))
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def engines_used(app):
+    """Names of the engines each statement ran on, in order."""
+    used = []
+    with app.app_context():
+        engines = dict(db.engines)
+    for name, engine in engines.items():
+        event.listen(engine, 'before_cursor_execute', lambda *args, name=name or 'primary': used.append(name))
+    return used
+
+
+def test_every_statement_of_a_request_reads_from_one_replica(client, engines_used):
+    chosen = []
+    for n in range(4):
+        engines_used.clear()
+        response = client.get(f'/accommodations?n={n}')
+        assert response.status_code == 200
+        assert len(engines_used) > 1
+        assert len(set(engines_used)) == 1
+        assert response.get_json()['items'][0]['name'] == engines_used[0]
+        chosen.append(engines_used[0])
+    assert set(chosen) == set(REPLICAS)
+
+
+def test_a_writer_reads_from_the_primary_without_cookies(app, auth, engines_used):
+    writer, other = app.test_client(use_cookies=False), app.test_client(use_cookies=False)
+    review = {'rating': 5, 'content': 'quiet', 'accommodation_id': 1}
+    assert writer.post('/reviews', json=review, headers=auth(1, 'user')).status_code == 201
+
+    engines_used.clear()
+    assert writer.get('/accommodations/1', headers=auth(1, 'user')).get_json()['name'] == 'primary'
+    assert set(engines_used) == {'primary'}
+
+    engines_used.clear()
+    assert other.get('/accommodations/1', headers=auth(2, 'user')).status_code == 200
+    assert len(set(engines_used)) == 1 and engines_used[0] in REPLICAS
+
+
+def test_payment_job_status_is_read_from_the_primary(app, client, engines_used):
+    # Created after the replicas were copied, as if they had not caught up yet
+    with app.app_context():
+        db.session.add(Payment_job(id='job', phone_number='254700000001', amount=10, status='queued'))
+        db.session.commit()
+
+    engines_used.clear()
+    response = client.get('/mpesa/pay/job')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'queued'
+    assert engines_used and set(engines_used) == {'primary'}
@@ -0,0 +1,18 @@
+from models import db, User
+
+HASH = '$2b$04$abcdefghijklmnopqrstuvABCDEFGHIJKLMNOPQRSTUVWXYZ012345'
+
+
+def test_review_hits_do_not_expose_the_author(app, client, auth):
+    with app.app_context():
+        db.session.add(User(id=1, name='Amina', email='amina@example.com', password=HASH, role='user'))
+        db.session.commit()
+    assert client.post('/reviews', json={'rating': 5, 'content': 'quiet and clean'}, headers=auth(1, 'user')).status_code == 201
+
+    response = client.get('/search?q=quiet')
+    assert response.status_code == 200
+    [hit] = response.get_json()['items']
+    assert hit['type'] == 'review'
+    assert hit['data']['user'] == {'id': 1, 'name': 'Amina'}
+    assert HASH not in response.get_data(as_text=True)
+    assert 'amina@example.com' not in response.get_data(as_text=True)
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use by the payment, email-validation and migration paths, never by a booting worker
+LAZY_MODULES = {
+    'requests', 'urllib3', 'marshmallow', 'flask_marshmallow', 'alembic', 'flask_migrate', 'redis',
+    'mpesa', 'sessions', 'payment_jobs', 'payment_callbacks',
+}
+# Locally about 0.7s; the budget only catches an eager import of something heavy
+IMPORT_BUDGET = 2.5
+
+
+def import_times(code):
+    """Run code in a fresh interpreter under -X importtime; {module: cumulative seconds}."""
+    env = dict(os.environ, DATABASE_URL='sqlite://')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_building_the_app_leaves_the_integrations_unloaded():
+    times = import_times("import app; app.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})")
+
+    assert 'app' in times
+    assert LAZY_MODULES.isdisjoint(name.split('.')[0] for name in times), sorted(
+        name for name in times if name.split('.')[0] in LAZY_MODULES
+    )
+    assert times['app'] < IMPORT_BUDGET, f"import app took {times['app']:.2f}s"